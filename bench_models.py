@@ -0,0 +1,65 @@
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from src.api import ModelJSONResponse
+from src.validation.models import APIResponse, ExtractedData, Invoice, LineItem, PageData, TokenUsage
+
+ITEMS = 5000
+PAGES = 10
+
+
+def timed(label, fn, repeat=5):
+    best = min(_run(fn) for _ in range(repeat))
+    print(f"{label:<45} {best * 1000:8.2f} ms")
+
+
+def _run(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def rows():
+    return [{
+        'item_name': f"Item {i}",
+        'item_rate': float(i % 50 + 1),
+        'item_quantity': float(i % 3 + 1),
+        'item_amount': float((i % 50 + 1) * (i % 3 + 1))
+    } for i in range(ITEMS)]
+
+
+def build_invoice(items):
+    per_page = len(items) // PAGES
+    return Invoice(pages=[PageData(page_no=str(p + 1), bill_items=items[p * per_page:(p + 1) * per_page])
+                          for p in range(PAGES)])
+
+
+def aggregates(invoice):
+    # The pipeline + API read these for dedup, totals and the item count
+    invoice.all_items
+    invoice.calculated_total
+    invoice.total_item_count
+
+
+def response(invoice):
+    return APIResponse(is_success=True, token_usage=TokenUsage(),
+                       data=ExtractedData(pagewise_line_items=invoice.pages,
+                                          total_item_count=invoice.total_item_count))
+
+
+if __name__ == "__main__":
+    data = rows()
+    print(f"{ITEMS} line items over {PAGES} pages")
+
+    timed("LineItem(**d)", lambda: [LineItem(**d) for d in data])
+    timed("LineItem.bulk_from_clean", lambda: LineItem.bulk_from_clean(data))
+
+    invoice = build_invoice(LineItem.bulk_from_clean(data))
+    timed("aggregates on a new invoice (includes build)", lambda: aggregates(build_invoice(invoice.all_items)))
+    timed("aggregates, cached", lambda: aggregates(invoice))
+
+    resp = response(invoice)
+    timed("validate + jsonable_encoder + JSONResponse",
+          lambda: JSONResponse(jsonable_encoder(APIResponse.model_validate(resp.model_dump()))))
+    timed("ModelJSONResponse", lambda: ModelJSONResponse(resp))
@@ -1,16 +1,41 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, JSONResponse
+from pydantic import BaseModel, Field, HttpUrl
+from typing import Optional, Any
+from contextlib import asynccontextmanager
+import asyncio
+import hmac
 import traceback
+import os
 
 from .pipeline.core import ExtractionPipeline
+from .pipeline.warmup import WarmupState, start_warmup
 from .validation.models import APIResponse, ExtractedData, TokenUsage
+from .utils.metrics import REGISTRY
+from .utils.profiling import ProfileStore
+from .utils.memory import get_memory_governor
+from .utils.deadline import Deadline
+
+warmup_state = WarmupState()
+# How often a running extraction checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.environ.get("DISCONNECT_POLL_SECONDS", "1"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background; /health reports ready once it is done
+    if os.environ.get("WARMUP", "1") == "1":
+        start_warmup(warmup_state)
+    else:
+        warmup_state.ready = True
+    yield
 
 app = FastAPI(
     title="Bill Extraction API",
     description="Intelligent Bill Line-Item Extraction Pipeline",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -22,25 +47,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class ModelJSONResponse(JSONResponse):
+    """
+    Serializes pydantic models with their own (compiled) JSON serializer.
+    Returning this from an endpoint also skips FastAPI's re-validation of
+    the response model, which is costly for bills with thousands of items.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            dump_json = getattr(content, "model_dump_json", None) or content.json
+            return dump_json().encode("utf-8")
+        return super().render(content)
+
 class BillRequest(BaseModel):
     document: str  # URL to the document
+    include_timings: bool = False  # Return per-stage timings in the response
+    profile: bool = False  # Capture a profile of this run (same as X-Profile: 1)
+    timeout_seconds: Optional[float] = Field(None, gt=0)  # Deadline for this request, capped at REQUEST_TIMEOUT
+    allow_partial: bool = False  # On deadline, return the pages finished so far instead of an error
+
+def _check_admin(token: Optional[str]):
+    # Profiles carry request URLs (possibly signed), so /admin/* stays closed without a token
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not token or not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+async def _cancel_on_disconnect(http_request: Request, deadline: Deadline):
+    """
+    Cancel the request's deadline as soon as the client goes away, so the
+    pipeline stops OCRing pages and calling the LLM for nobody.
+    """
+    while not deadline.cancelled:
+        if await http_request.is_disconnected():
+            print("Client disconnected, cancelling extraction")
+            deadline.cancel("disconnect")
+            return
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
 
 @app.get("/")
 async def root():
     return {
         "message": "Bill Extraction API",
         "endpoints": {
-            "POST /extract-bill-data": "Extract line items from a bill"
+            "POST /extract-bill-data": "Extract line items from a bill",
+            "GET /metrics": "Prometheus metrics",
+            "GET /admin/profiles": "List captured profiles"
         }
     }
 
-@app.post("/extract-bill-data", response_model=APIResponse)
-async def extract_bill_data(request: BillRequest):
+@app.post("/extract-bill-data", response_model=APIResponse, response_class=ModelJSONResponse)
+async def extract_bill_data(request: BillRequest, http_request: Request, x_profile: Optional[str] = Header(None)):
     """
     Extract line items and totals from a bill document.
     
     Args:
         request: BillRequest with document URL
+        http_request: The raw request, watched for client disconnects
+        x_profile: Optional X-Profile header ("1"/"true") to profile this run
         
     Returns:
         APIResponse with extracted data and token usage
@@ -50,15 +116,31 @@ async def extract_bill_data(request: BillRequest):
         pipeline = ExtractionPipeline()
         
         # Process the document
-        result = pipeline.process_url(request.document)
+        profile = request.profile or (x_profile or "").lower() in ("1", "true", "yes")
+        deadline = Deadline.for_request(request.timeout_seconds)
+        # Run in the threadpool so concurrent requests (and the memory governor) actually overlap
+        watcher = asyncio.ensure_future(_cancel_on_disconnect(http_request, deadline))
+        try:
+            result = await run_in_threadpool(pipeline.process_url, request.document, profile=profile,
+                                             deadline=deadline, allow_partial=request.allow_partial)
+        finally:
+            watcher.cancel()
+        stage_timings = result.get("stage_timings") if request.include_timings else None
         
         # Check for errors
         if "error" in result:
-            return APIResponse(
+            response = APIResponse(
                 is_success=False,
                 token_usage=result.get("token_usage", TokenUsage()),
-                error=result["error"]
+                error=result["error"],
+                stage_timings=stage_timings,
+                profile_id=result.get("profile_id")
             )
+            # Out of memory budget: tell clients and load balancers to back off and retry
+            if result.get("retry_after"):
+                return ModelJSONResponse(response, status_code=503,
+                                         headers={"Retry-After": str(result["retry_after"])})
+            return ModelJSONResponse(response)
         
         # Extract invoice and token usage
         invoice = result["invoice"]
@@ -67,27 +149,52 @@ async def extract_bill_data(request: BillRequest):
         # Build response
         extracted_data = ExtractedData(
             pagewise_line_items=invoice.pages,
-            total_item_count=len(invoice.all_items)
+            total_item_count=invoice.total_item_count
         )
         
-        return APIResponse(
+        return ModelJSONResponse(APIResponse(
             is_success=True,
             token_usage=token_usage,
-            data=extracted_data
-        )
+            data=extracted_data,
+            stage_timings=stage_timings,
+            profile_id=result.get("profile_id"),
+            partial=result.get("partial", False)
+        ))
         
     except Exception as e:
         print(f"API Error: {e}")
         traceback.print_exc()
-        return APIResponse(
+        return ModelJSONResponse(APIResponse(
             is_success=False,
             token_usage=TokenUsage(),
             error=str(e)
-        )
+        ))
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    memory = get_memory_governor().usage()
+    if not warmup_state.ready:
+        status = "warmup_failed" if warmup_state.failed_steps else "warming_up"
+        return JSONResponse(status_code=503, content={
+            "status": status, "warmup": warmup_state.as_dict(), "memory": memory})
+    return {"status": "healthy", "warmup": warmup_state.as_dict(), "memory": memory}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    return {"profiles": ProfileStore().list()}
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(None)):
+    _check_admin(x_admin_token)
+    profile = ProfileStore().load(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
 
 if __name__ == "__main__":
     import uvicorn
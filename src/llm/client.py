@@ -1,80 +1,158 @@
 import os
 import json
-from typing import List, Dict, Any, Optional, Tuple
-from groq import Groq
+import math
+import threading
+from typing import Dict, Any, Optional, Tuple, Iterator
 from .prompts import ROW_RECONSTRUCTION_PROMPT, AMBIGUITY_RESOLUTION_PROMPT
+from .compaction import estimate_tokens
+from .streaming import IncrementalItemParser
 from ..validation.models import TokenUsage
+from ..utils.metrics import LLM_CALLS, LLM_TOKENS, ERRORS
+from ..utils.deadline import Deadline, RequestCancelled
+
+_clients: Dict[Optional[str], Any] = {}
+_clients_lock = threading.Lock()
+
+def get_groq_client(api_key: Optional[str] = None) -> Any:
+    """
+    Process-wide Groq client per API key, so requests share one
+    connection pool instead of opening a new one per pipeline.
+    """
+    api_key = api_key or os.environ.get("GROQ_API_KEY")
+    with _clients_lock:
+        if api_key not in _clients:
+            from groq import Groq  # Heavy import, deferred until first use
+            _clients[api_key] = Groq(api_key=api_key)
+        return _clients[api_key]
 
 class LLMClient:
     def __init__(self, api_key: Optional[str] = None):
-        self.client = Groq(api_key=api_key or os.environ.get("GROQ_API_KEY"))
+        self.client = get_groq_client(api_key)
         # Using Llama 3.3 70B - fast and accurate
         self.model = "llama-3.3-70b-versatile"
         self.token_usage = TokenUsage()
+        # Whether the last table stream ended normally with a closed JSON array
+        self.last_stream_complete = False
 
     def _update_usage(self, input_tokens: int, output_tokens: int):
         self.token_usage.input_tokens += input_tokens
         self.token_usage.output_tokens += output_tokens
         self.token_usage.total_tokens += (input_tokens + output_tokens)
+        LLM_TOKENS.inc(input_tokens, direction="input")
+        LLM_TOKENS.inc(output_tokens, direction="output")
 
-    def reconstruct_table(self, text_segment: str) -> List[Dict[str, Any]]:
+    def stream_table(self, text_segment: str, max_tokens: int = 4096,
+                     deadline: Optional[Deadline] = None) -> Iterator[Dict[str, Any]]:
         """
-        Send text segment to LLM to reconstruct table rows.
+        Stream the table reconstruction and yield each validated line item
+        as soon as its JSON object closes. If the stream fails or is cut
+        short, the items already yielded are kept. When the request's
+        deadline passes (or it is cancelled) the stream is closed and
+        RequestCancelled is raised.
         """
+        if deadline:
+            deadline.check()
         prompt = ROW_RECONSTRUCTION_PROMPT.format(text_segment=text_segment)
+        LLM_CALLS.inc(operation="reconstruct_table")
         
+        self.last_stream_complete = False
+        parser = IncrementalItemParser()
+        output_chars = 0
+        usage = None
+        stream = None
+        options = {}
+        if deadline and deadline.remaining() is not None:
+            # The HTTP call itself must not outlive the request
+            options["timeout"] = max(deadline.remaining(), 0.1)
         try:
-            response = self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an expert at extracting structured bill data. Always return valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.1,
-                max_tokens=4096,
+                max_tokens=max_tokens,
+                stream=True,
+                **options
             )
             
-            # Update usage
-            self._update_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
-            
-            # Basic parsing, assuming the LLM returns pure JSON or JSON block
-            content = response.choices[0].message.content.strip()
-            
-            # Find JSON start/end if there's extra text
-            start = content.find('[')
-            end = content.rfind(']') + 1
-            if start != -1 and end != -1:
-                json_str = content[start:end]
-                items = json.loads(json_str)
-                
-                # Validate and clean items
-                valid_items = []
-                for item in items:
-                    if isinstance(item, dict) and 'item_name' in item and 'item_amount' in item:
-                        # Ensure all required fields exist
-                        valid_item = {
-                            'item_name': str(item.get('item_name', '')).strip(),
-                            'item_rate': float(item.get('item_rate', 0.0)),
-                            'item_quantity': float(item.get('item_quantity', 1.0)),
-                            'item_amount': float(item.get('item_amount', 0.0))
-                        }
-                        if valid_item['item_name'] and valid_item['item_amount'] > 0:
-                            valid_items.append(valid_item)
-                
-                return valid_items
+            for chunk in stream:
+                if deadline:
+                    deadline.check()
+                usage = self._chunk_usage(chunk) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                output_chars += len(delta)
+                for item in parser.feed(delta):
+                    valid_item = self._clean_item(item)
+                    if valid_item:
+                        yield valid_item
             
-            return []
+            self.last_stream_complete = parser.complete
+            if not parser.complete:
+                print("stream_table: response ended before the JSON array closed, keeping partial items")
+        except RequestCancelled:
+            raise
         except Exception as e:
-            print(f"Error in reconstruct_table: {e}")
+            if deadline and deadline.cancelled:
+                raise RequestCancelled(deadline.reason)
+            print(f"Error in stream_table: {e}")
+            ERRORS.inc(stage="llm")
             import traceback
             traceback.print_exc()
-            return []
+        finally:
+            # Closing the stream drops the connection, so the server stops generating
+            close = getattr(stream, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception:
+                    pass
+            # Update usage (estimated when the stream never reported it)
+            if usage is not None:
+                self._update_usage(usage.prompt_tokens, usage.completion_tokens)
+            else:
+                self._update_usage(estimate_tokens(prompt), math.ceil(output_chars / 4))
+
+    @staticmethod
+    def _chunk_usage(chunk: Any) -> Optional[Any]:
+        """
+        Usage arrives on the final chunk, either as chunk.usage or chunk.x_groq.usage.
+        """
+        usage = getattr(chunk, "usage", None)
+        if usage is None:
+            usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+        return usage
+
+    @staticmethod
+    def _clean_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Validate and clean one LLM item; returns None if it is unusable.
+        """
+        if 'item_name' not in item or 'item_amount' not in item:
+            return None
+        try:
+            # Ensure all required fields exist
+            valid_item = {
+                'item_name': str(item.get('item_name', '')).strip(),
+                'item_rate': float(item.get('item_rate') or 0.0),
+                'item_quantity': float(item.get('item_quantity') or 1.0),
+                'item_amount': float(item.get('item_amount') or 0.0)
+            }
+        except (TypeError, ValueError):
+            return None
+        if valid_item['item_name'] and valid_item['item_amount'] > 0:
+            return valid_item
+        return None
 
     def resolve_ambiguity(self, row_data: Dict[str, Any], context: str) -> Dict[str, Any]:
         """
         Resolve ambiguity in a specific row.
         """
         prompt = AMBIGUITY_RESOLUTION_PROMPT.format(row_data=row_data, context=context)
+        LLM_CALLS.inc(operation="resolve_ambiguity")
         
         try:
             response = self.client.chat.completions.create(
@@ -98,6 +176,7 @@ class LLMClient:
             return row_data
         except Exception as e:
             print(f"Error in resolve_ambiguity: {e}")
+            ERRORS.inc(stage="llm")
             return row_data
             
     def get_usage(self) -> TokenUsage:
@@ -0,0 +1,95 @@
+import math
+import re
+from typing import List, Dict, Any, Optional
+from ..utils.table_header import find_header
+
+NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+AMOUNT_RE = re.compile(r'\d[\d,]*\.\d{1,2}\b')
+
+# Output cost of one JSON line item's keys and punctuation, on top of its own text
+ROW_JSON_TOKENS = 32
+TOKENS_OVERHEAD = 64
+# Headroom on the output estimate: JSON and digits tokenize worse than prose
+OUTPUT_SAFETY = 1.5
+MIN_MAX_TOKENS = 256
+MAX_MAX_TOKENS = 4096
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English/number text).
+    """
+    return math.ceil(len(text) / 4)
+
+
+def _is_tabular(words: List[Dict[str, Any]]) -> bool:
+    """
+    A line looks like a table row if it carries a money-like amount
+    or several numbers (qty / rate / amount).
+    """
+    text = ' '.join(w['text'] for w in words)
+    return bool(AMOUNT_RE.search(text)) or len(NUMBER_RE.findall(text)) >= 2
+
+
+def _join_words(words: List[Dict[str, Any]]) -> str:
+    """
+    Join a line's words, marking wide horizontal gaps (column breaks) with ' | '.
+    """
+    parts = []
+    prev_end = None
+    for word in words:
+        text = ' '.join(word['text'].split())
+        if not text:
+            continue
+        x, _, w, h = word['bbox']
+        if prev_end is not None:
+            parts.append(' | ' if x - prev_end > 2 * max(h, 1) else ' ')
+        parts.append(text)
+        prev_end = x + w
+    return ''.join(parts)
+
+
+class CompactedText:
+    """
+    Result of compacting a page for the LLM, with before/after token estimates.
+    """
+
+    def __init__(self, text: str, expected_rows: int, tokens_before: int):
+        self.text = text
+        self.expected_rows = expected_rows
+        self.tokens_before = tokens_before
+        self.tokens_after = estimate_tokens(text)
+
+    @property
+    def max_tokens(self) -> int:
+        """
+        Output budget sized from the rows we expect back: each row's JSON
+        keys plus its own text (long item names cost more), with headroom.
+        """
+        rows = self.expected_rows * ROW_JSON_TOKENS + self.tokens_after
+        budget = math.ceil(rows * OUTPUT_SAFETY) + TOKENS_OVERHEAD
+        return max(MIN_MAX_TOKENS, min(MAX_MAX_TOKENS, budget))
+
+
+def compact_page(lines: List[List[Dict[str, Any]]], raw_text: str) -> CompactedText:
+    """
+    Keep only the table block of a page: from the header row (or first
+    numeric row) to the last numeric row. Letterheads, addresses, patient
+    details and footer disclaimers fall outside that block and are dropped.
+    Text-only lines inside the block are kept as wrapped item names.
+    """
+    tokens_before = estimate_tokens(raw_text)
+    tabular = [i for i, words in enumerate(lines) if _is_tabular(words)]
+    if not tabular:
+        # Nothing row-like in the OCR geometry; send normalized text as is
+        text = '\n'.join(' '.join(line.split()) for line in raw_text.splitlines() if line.strip())
+        return CompactedText(text, expected_rows=len(text.splitlines()), tokens_before=tokens_before)
+
+    header_idx: Optional[int] = find_header(lines)
+    start = header_idx if header_idx is not None and header_idx < tabular[-1] else tabular[0]
+    end = tabular[-1]
+
+    kept = [_join_words(words) for words in lines[start:end + 1]]
+    text = '\n'.join(line for line in kept if line)
+    expected_rows = sum(1 for i in tabular if start <= i <= end and i != header_idx)
+    return CompactedText(text, expected_rows=expected_rows, tokens_before=tokens_before)
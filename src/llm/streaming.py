@@ -0,0 +1,69 @@
+import json
+from typing import List, Dict, Any
+
+
+class IncrementalItemParser:
+    """
+    Incrementally parses a streamed JSON array of objects.
+    Text is fed chunk by chunk; every top-level object inside the array is
+    returned as soon as its closing brace arrives, so a truncated response
+    still yields all items completed before the cut.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        items = []
+        for ch in text:
+            if self._done:
+                break
+            if not self._in_array:
+                # Skip any preamble before the array ("Here is the JSON: [")
+                if ch == '[':
+                    self._in_array = True
+                continue
+
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._buffer = [ch]
+                elif ch == ']':
+                    self._done = True
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads(''.join(self._buffer))
+                        if isinstance(obj, dict):
+                            items.append(obj)
+                    except json.JSONDecodeError as e:
+                        print(f"Skipping malformed streamed item: {e}")
+                    self._buffer = []
+        return items
+
+    @property
+    def complete(self) -> bool:
+        """
+        True once the closing bracket of the array has been seen.
+        """
+        return self._done
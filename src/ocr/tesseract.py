@@ -1,8 +1,15 @@
-import pytesseract
+import os
 import numpy as np
 from typing import List, Dict, Any
 from .engine import OCREngine
 
+def _pytesseract():
+    # pytesseract pulls in pandas when installed; only import it when OCR actually runs
+    import pytesseract
+    if os.environ.get("TESSERACT_CMD"):
+        pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+    return pytesseract
+
 class TesseractOCR(OCREngine):
     """
     Tesseract OCR implementation.
@@ -12,12 +19,13 @@ class TesseractOCR(OCREngine):
         """
         Extract raw text using Tesseract.
         """
-        return pytesseract.image_to_string(image)
+        return _pytesseract().image_to_string(image)
 
     def extract_data(self, image: np.ndarray) -> List[Dict[str, Any]]:
         """
         Extract detailed data using Tesseract.
         """
+        pytesseract = _pytesseract()
         data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
         results = []
         
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import List, Dict, Any, Optional
+from ..validation.models import LineItem
+
+# Set CHECKPOINT=0 to disable per-page checkpoints
+CHECKPOINT_ENABLED = os.environ.get("CHECKPOINT", "1") == "1"
+CHECKPOINT_DIR = os.environ.get("CHECKPOINT_DIR", os.path.join(tempfile.gettempdir(), "bill_checkpoints"))
+# Checkpoints of documents not retried within this many seconds are removed
+CHECKPOINT_TTL = float(os.environ.get("CHECKPOINT_TTL", "86400"))
+
+
+def document_hash(file_path: str) -> str:
+    """
+    SHA-256 of the downloaded file, so a retry finds its checkpoints
+    whatever URL the document was fetched from.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def items_to_records(items: List[LineItem]) -> List[Dict[str, Any]]:
+    return [{"item_name": item.item_name, "item_rate": item.item_rate,
+             "item_quantity": item.item_quantity, "item_amount": item.item_amount} for item in items]
+
+
+class DocumentCheckpoint:
+    """
+    Checkpoints of one document: one JSON file per page, holding either the
+    OCR output ("ocr") or the finished page ("done" / "skipped").
+    A checkpoint without a document hash does nothing.
+    """
+
+    def __init__(self, store: "CheckpointStore", doc_hash: Optional[str]):
+        self.store = store
+        self.doc_hash = doc_hash
+        self.pages: Dict[int, Dict[str, Any]] = store._load(doc_hash) if doc_hash else {}
+
+    def get(self, page_num: int) -> Optional[Dict[str, Any]]:
+        return self.pages.get(page_num)
+
+    def save(self, page_num: int, status: str, **record):
+        if not self.doc_hash:
+            return
+        record["status"] = status
+        self.pages[page_num] = record
+        try:
+            self.store._save(self.doc_hash, page_num, record)
+        except Exception as e:
+            print(f"Error saving checkpoint for page {page_num}: {e}")
+
+    def clear(self):
+        """
+        Drop the checkpoints once the document was extracted completely.
+        """
+        if self.doc_hash:
+            self.store.remove(self.doc_hash)
+
+
+class CheckpointStore:
+    """
+    Local store of per-page results keyed by document hash and page number,
+    so a retried request resumes from the first incomplete page.
+    """
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None,
+                 enabled: Optional[bool] = None):
+        self.directory = directory or CHECKPOINT_DIR
+        self.ttl = CHECKPOINT_TTL if ttl is None else ttl
+        self.enabled = CHECKPOINT_ENABLED if enabled is None else enabled
+
+    def open(self, file_path: str) -> DocumentCheckpoint:
+        """
+        Checkpoints for a downloaded document; a no-op when disabled or the
+        file cannot be hashed.
+        """
+        doc_hash = None
+        if self.enabled:
+            try:
+                doc_hash = document_hash(file_path)
+            except OSError as e:
+                print(f"Checkpoints disabled for this request: {e}")
+        return DocumentCheckpoint(self, doc_hash)
+
+    def _doc_dir(self, doc_hash: str) -> str:
+        return os.path.join(self.directory, doc_hash)
+
+    def _load(self, doc_hash: str) -> Dict[int, Dict[str, Any]]:
+        pages = {}
+        directory = self._doc_dir(doc_hash)
+        if not os.path.isdir(directory):
+            return pages
+        for name in os.listdir(directory):
+            stem, ext = os.path.splitext(name)
+            if ext != ".json" or not stem.isdigit():
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    pages[int(stem)] = json.load(f)
+            except Exception as e:
+                print(f"Ignoring unreadable checkpoint {name}: {e}")
+        if pages:
+            print(f"Resuming document {doc_hash[:12]} with {len(pages)} checkpointed pages")
+        return pages
+
+    def _save(self, doc_hash: str, page_num: int, record: Dict[str, Any]):
+        directory = self._doc_dir(doc_hash)
+        if not os.path.isdir(directory):
+            self._prune()
+            os.makedirs(directory, exist_ok=True)
+        # Written atomically so a crash never leaves a half-written page behind
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, os.path.join(directory, f"{page_num}.json"))
+
+    def remove(self, doc_hash: str):
+        shutil.rmtree(self._doc_dir(doc_hash), ignore_errors=True)
+
+    def _prune(self):
+        if not os.path.isdir(self.directory):
+            return
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
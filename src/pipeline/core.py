@@ -1,92 +1,203 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import math
 import numpy as np
 import os
 import re
+import time
 from ..ocr.tesseract import TesseractOCR
 from ..llm.client import LLMClient
+from ..llm.compaction import compact_page, CompactedText
 from ..validation.models import Invoice, LineItem, PageData, TokenUsage
 from ..validation.logic import Validator
+from ..validation.reconciliation import Reconciler
 from ..utils.input_handler import InputHandler
 from ..utils.image_processing import ImagePreprocessor
+from .templates import get_template_store
+from .triage import PageTriage, classify_page_type
+from .page_index import get_page_index, perceptual_hash, same_page, same_text, CachedPage, Signature
+from .checkpoints import CheckpointStore, DocumentCheckpoint, items_to_records
+from ..utils.metrics import (StageTimer, PAGES_PROCESSED, PAGE_PATH, REQUEST_SECONDS, count_error, CACHE_HITS,
+                             PROMPT_TOKENS, RECONCILIATIONS, PAGES_DOWNSAMPLED, PAGE_TRIAGE)
+from ..utils.profiling import RequestProfiler
+from ..utils.memory import get_memory_governor, MemoryBudgetExceeded, MAX_PAGE_MEGAPIXELS, MEMORY_RETRY_AFTER
+from ..utils.deadline import Deadline, RequestCancelled
+
+def _checkpoint_key(saved: Dict[str, Any]) -> Optional[Tuple[int, Signature]]:
+    """
+    Page index key from a checkpoint (JSON turns the signature tuple into a list).
+    """
+    key = saved.get("key")
+    if not key:
+        return None
+    return key[0], tuple(key[1]) if key[1] is not None else None
+
+class DocumentPages:
+    """
+    Per-request page results, kept in step with each other (and filled in
+    place) so the pages finished before a cancellation can be returned.
+    """
+
+    def __init__(self, checkpoint: Optional[DocumentCheckpoint] = None):
+        self.checkpoint = checkpoint or DocumentCheckpoint(CheckpointStore(enabled=False), None)
+        self.pages: List[PageData] = []
+        self.texts: List[str] = []
+        self.lines: List[List[List[Dict[str, Any]]]] = []
+        # Page index key (hash, signature) of each page, None when not hashed
+        self.keys: List[Optional[Tuple[int, Signature]]] = []
+        # Indexes of pages whose items came from the LLM
+        self.slow_path: List[int] = []
+        # (hash, signature, page_no, OCR text) of every page seen, for duplicates within the document
+        self.seen: List[Tuple[int, Signature, str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def add(self, page: PageData, text: str, lines: List[List[Dict[str, Any]]],
+            key: Optional[Tuple[int, Signature]] = None, slow_path: bool = False):
+        if slow_path:
+            self.slow_path.append(len(self.pages))
+        self.pages.append(page)
+        self.texts.append(text)
+        self.lines.append(lines)
+        self.keys.append(key)
+
+    def duplicate_of(self, phash: int, signature: Signature, raw_text: str) -> Optional[str]:
+        """
+        Page number of an earlier page of this document that this one repeats:
+        a close hash is not enough, the full OCR text has to match too.
+        """
+        for seen_hash, seen_signature, page_no, seen_text in self.seen:
+            if same_page(phash, signature, seen_hash, seen_signature) and same_text(raw_text, seen_text):
+                return page_no
+        return None
 
 class ExtractionPipeline:
     def __init__(self):
         self.ocr = TesseractOCR()
         self.llm = LLMClient()
         self.validator = Validator()
+        self.reconciler = Reconciler(self.validator)
         self.input_handler = InputHandler()
         self.preprocessor = ImagePreprocessor()
+        self.templates = get_template_store()
+        self.memory = get_memory_governor()
+        self.triage = PageTriage()
+        self.page_index = get_page_index()
+        self.checkpoints = CheckpointStore()
 
-    def process_url(self, url: str) -> Dict[str, Any]:
+    def process_url(self, url: str, profile: bool = False, deadline: Optional[Deadline] = None,
+                    allow_partial: bool = False) -> Dict[str, Any]:
         """
         Main entry point for processing a bill from a URL.
-        Returns dict with token_usage and invoice data.
+        Returns dict with token_usage, stage_timings and invoice data.
+        When profiling was requested (or the run is slow) a profile_id is added.
+        Work stops once the deadline passes or is cancelled; with allow_partial
+        the pages finished so far are returned with partial=True, otherwise
+        the result is an error.
         """
+        timer = StageTimer()
+        profiler = RequestProfiler(requested=profile)
+        profiler.start()
+        start = time.perf_counter()
+        
+        result = self._process(url, timer, deadline or Deadline(), allow_partial)
+        
+        result["stage_timings"] = self._finish_timings(timer, start)
+        profile_id = profiler.stop(timer.spans, url=url, stage_timings=result["stage_timings"])
+        if profile_id:
+            result["profile_id"] = profile_id
+        return result
+
+    def _process(self, url: str, timer: StageTimer, deadline: Deadline, allow_partial: bool) -> Dict[str, Any]:
         print(f"Downloading from {url}...")
         file_path = None
         try:
-            file_path = self.input_handler.download_file(url)
-            images = self.input_handler.load_pages(file_path)
+            with timer.stage("download"):
+                file_path = self.input_handler.download_file(url, deadline)
+            with timer.stage("rasterize"):
+                page_count = self.input_handler.count_pages(file_path)
             
-            pages_data = []
+            # Pages finished by an earlier, failed attempt of this document are reused
+            with timer.stage("checkpoint"):
+                doc = DocumentPages(self.checkpoints.open(file_path))
+            compaction = {"tokens_before": 0, "tokens_after": 0}
+            cancelled = None
             
-            for i, image in enumerate(images):
-                page_num = i + 1
-                print(f"Processing page {page_num}...")
-                
-                # Step 1: Preprocess
-                processed_image = self.preprocessor.preprocess(image)
-                
-                # Step 2: OCR + Layout extraction
-                ocr_data = self.ocr.extract_data(processed_image)
-                raw_text = self.ocr.extract_text(processed_image)
-                
-                # Step 3: Table & row reconstruction (Fast Path)
-                page_items = self._parse_ocr_to_items(ocr_data, page_num)
-                
-                # Step 4: Ambiguous row → Sonnet refinement (Slow Path)
-                if not page_items:
-                    print(f"Page {page_num}: No items found via OCR. Using LLM...")
-                    llm_data = self.llm.reconstruct_table(raw_text)
-                    for d in llm_data:
-                        try:
-                            page_items.append(LineItem(**d))
-                        except Exception as e:
-                            print(f"Error creating LineItem: {e}, data: {d}")
-                
-                # Classify page type
-                page_type = self._classify_page_type(raw_text)
-                
-                pages_data.append(PageData(
-                    page_no=str(page_num),
-                    page_type=page_type,
-                    bill_items=page_items
-                ))
-
-            # Construct Invoice
-            invoice = Invoice(pages=pages_data)
+            try:
+                self._process_pages(file_path, page_count, timer, deadline, compaction, doc)
+            except RequestCancelled as e:
+                if not allow_partial or not len(doc):
+                    raise
+                cancelled = e.reason
+                print(f"Request cancelled ({e.reason}) after {len(doc)} of {page_count} pages, "
+                      f"returning partial result")
             
-            # Step 6: Deduplication + reconciliation
-            all_items = invoice.all_items
-            unique_items = self.validator.deduplicate_rows(all_items)
+            # Construct Invoice
+            invoice = Invoice(pages=doc.pages)
             
-            # Rebuild pages with deduplicated items
-            # For simplicity, we'll keep the page structure but note this is a simplified approach
-            # In production, you'd want to track which page each item came from
+            # Step 5: Subtotal & final total reconciliation
+            # Only pages whose totals don't add up go back through the slow path
+            with timer.stage("reconcile"):
+                report = self.reconciler.reconcile(invoice, doc.texts)
+            reextracted = []
+            for idx in ([] if cancelled else self.reconciler.pages_to_reextract(report, doc.slow_path)):
+                page = invoice.pages[idx]
+                print(f"Page {page.page_no}: totals do not reconcile. Re-extracting with LLM...")
+                PAGE_PATH.inc(path="reconcile")
+                try:
+                    items = self._run_slow_path(doc.lines[idx], doc.texts[idx], int(page.page_no),
+                                                timer, compaction, deadline)
+                except RequestCancelled as e:
+                    # Every page is already extracted; only the refinement is cut short
+                    print(f"Re-extraction stopped ({e.reason}), keeping current items")
+                    break
+                old_sum = sum(item.item_amount for item in page.bill_items)
+                new_sum = sum(item.item_amount for item in items)
+                if items and self.reconciler.improves(report, idx, old_sum, new_sum):
+                    page.bill_items = items
+                    report["calculated_total"] += new_sum - old_sum
+                    reextracted.append(page.page_no)
+                    if doc.keys[idx]:
+                        self.page_index.update_items(*doc.keys[idx], doc.texts[idx], items)
+            if reextracted:
+                with timer.stage("reconcile"):
+                    report = self.reconciler.reconcile(invoice, doc.texts)
+            report["reextracted_pages"] = reextracted
+            RECONCILIATIONS.inc(outcome=self._reconcile_outcome(report))
             
-            # Step 5: Extract totals from the document
-            total_amount = self._extract_total(raw_text) if images else 0.0
-            invoice.total_amount = total_amount
+            result = {
+                "invoice": invoice,
+                "token_usage": self.llm.get_usage(),
+                "prompt_compaction": compaction,
+                "reconciliation": report
+            }
+            if cancelled:
+                result.update(partial=True, cancelled=cancelled, pages_total=page_count)
+            else:
+                doc.checkpoint.clear()
+            return result
             
+        except RequestCancelled as e:
+            print(f"Pipeline cancelled: {e.reason}")
             return {
-                "invoice": invoice,
+                "error": str(e),
+                "cancelled": e.reason,
+                "token_usage": self.llm.get_usage()
+            }
+        except MemoryBudgetExceeded as e:
+            # The worker is overloaded, not the document at fault: the client should retry
+            print(f"Pipeline rejected: {e}")
+            return {
+                "error": str(e),
+                "retry_after": MEMORY_RETRY_AFTER,
                 "token_usage": self.llm.get_usage()
             }
-            
         except Exception as e:
             print(f"Pipeline Error: {e}")
             import traceback
             traceback.print_exc()
+            # Counted under "pipeline" only if no timed stage counted it already
+            count_error(e, "pipeline")
             return {
                 "error": str(e),
                 "token_usage": self.llm.get_usage()
@@ -99,18 +210,298 @@ class ExtractionPipeline:
                 except Exception as e:
                     print(f"Error removing temp file: {e}")
 
+    def _process_pages(self, file_path: str, page_count: int, timer: StageTimer, deadline: Deadline,
+                       compaction: Dict[str, int], doc: DocumentPages):
+        """
+        Steps 1-4 for every page, adding each finished page to doc so that
+        the pages finished before a cancellation are kept.
+        """
+        checkpoint = doc.checkpoint
+        for i in range(page_count):
+            page_num = i + 1
+            deadline.check()
+            saved = checkpoint.get(page_num)
+            if saved and saved["status"] != "ocr":
+                self._restore_page(page_num, saved, doc)
+                continue
+            print(f"Processing page {page_num}...")
+            
+            with timer.span("page", page=page_num):
+                if saved:
+                    # OCR finished in an earlier attempt; only parsing and the LLM are left
+                    print(f"Page {page_num}: resuming from OCR checkpoint")
+                    CACHE_HITS.inc(cache="checkpoint")
+                    ocr_data, raw_text, page_width = saved["ocr_data"], saved["raw_text"], saved["page_width"]
+                    key, triage_type = _checkpoint_key(saved), saved.get("triage_page_type")
+                    if key:
+                        doc.seen.append(key + (str(page_num), raw_text))
+                else:
+                    ocr = self._rasterize_and_ocr(file_path, page_num, timer, deadline, doc)
+                    if ocr is None:
+                        continue
+                    ocr_data, raw_text, page_width, key, triage_type = ocr
+                
+                # Step 3: Table & row reconstruction (Fast Path)
+                # Known vendor layouts are parsed with their stored column map
+                with timer.stage("parse"):
+                    lines = self._group_lines(ocr_data)
+                    page_items = self.templates.match(lines, page_width)
+                    from_template = page_items is not None
+                    if not from_template:
+                        page_items = self._parse_lines_to_items(lines)
+                
+                # Step 4: Ambiguous row → Sonnet refinement (Slow Path)
+                slow_path = False
+                if from_template:
+                    PAGE_PATH.inc(path="template")
+                    CACHE_HITS.inc(cache="template")
+                elif not page_items:
+                    print(f"Page {page_num}: No items found via OCR. Using LLM...")
+                    PAGE_PATH.inc(path="llm")
+                    page_items = self._run_slow_path(lines, raw_text, page_num, timer, compaction, deadline)
+                    slow_path = True
+                else:
+                    PAGE_PATH.inc(path="fast")
+                
+                if not from_template:
+                    with timer.stage("template_learn"):
+                        self.templates.learn(lines, page_width, page_items)
+                
+                # Classify page type; the full text wins, triage fills in what it missed
+                page_type = self._classify_page_type(raw_text)
+                if page_type == "Bill Detail" and triage_type:
+                    page_type = triage_type
+                
+                doc.add(PageData(
+                    page_no=str(page_num),
+                    page_type=page_type,
+                    bill_items=page_items
+                ), raw_text, lines, key, slow_path=slow_path)
+                if key:
+                    self.page_index.add(CachedPage(key[0], key[1], raw_text, page_width, lines,
+                                                   list(page_items), page_type, slow_path))
+                # A cut-off LLM stream leaves the page at its OCR checkpoint, so a retry asks again
+                if not slow_path or self.llm.last_stream_complete:
+                    checkpoint.save(page_num, "done", raw_text=raw_text, lines=lines, page_type=page_type,
+                                    items=items_to_records(page_items), slow_path=slow_path, key=key)
+                PAGES_PROCESSED.inc()
+
+    def _rasterize_and_ocr(self, file_path: str, page_num: int, timer: StageTimer, deadline: Deadline,
+                           doc: DocumentPages) -> Optional[Tuple[List[Dict[str, Any]], str, int,
+                                                                 Optional[Tuple[int, Signature]], Optional[str]]]:
+        """
+        Rasterize, triage, hash and OCR one page, checkpointing the OCR output.
+        The page's pixels are reserved with the memory governor before it is
+        rendered, from its size on disk, and held until its copies are gone.
+        Returns (ocr_data, raw_text, page_width, index key, triage page type),
+        or None when the page needs no further work (skipped, duplicate, or
+        reused from the page index).
+        """
+        # Pages above MAX_PAGE_MEGAPIXELS are rendered smaller rather than
+        # downsampled after a full-size render. Unknown sizes reserve the cap.
+        cap = int(MAX_PAGE_MEGAPIXELS * 1e6)
+        pixels, scale = cap, 1.0
+        with timer.stage("rasterize"):
+            size = self.input_handler.page_size(file_path, page_num)
+        if size:
+            width, height = size
+            if width * height > cap:
+                scale = math.sqrt(cap / (width * height))
+                print(f"Page {page_num}: rendering {width}x{height} at {MAX_PAGE_MEGAPIXELS} MP")
+                PAGES_DOWNSAMPLED.inc()
+            pixels = min(width * height, cap)
+        
+        self._reserve_memory(pixels, timer, deadline)
+        try:
+            return self._render_and_ocr(file_path, page_num, scale, timer, deadline, doc)
+        finally:
+            self.memory.release(pixels)
+
+    def _reserve_memory(self, pixels: int, timer: StageTimer, deadline: Optional[Deadline]):
+        """
+        Wait for memory budget, no longer than the request has left.
+        """
+        timeout = None
+        if deadline and deadline.remaining() is not None:
+            timeout = min(self.memory.queue_timeout, deadline.remaining())
+        with timer.stage("memory_wait"):
+            try:
+                self.memory.acquire(pixels, timeout=timeout)
+            except MemoryBudgetExceeded:
+                if deadline:
+                    deadline.check()
+                raise
+
+    def _render_and_ocr(self, file_path: str, page_num: int, scale: float, timer: StageTimer,
+                        deadline: Deadline, doc: DocumentPages) -> Optional[Tuple[List[Dict[str, Any]], str, int,
+                                                                   Optional[Tuple[int, Signature]], Optional[str]]]:
+        """
+        Render the page at the given scale and triage, hash and OCR it, while
+        its pixels are reserved.
+        """
+        checkpoint = doc.checkpoint
+        
+        # Pages are rasterized one at a time and dropped after OCR
+        with timer.stage("rasterize"):
+            image = self.input_handler.load_page(file_path, page_num, scale=scale)
+        if image is None:
+            return None
+        
+        # Triage on a thumbnail: non-bill pages skip all further work
+        triage = None
+        if self.triage.enabled:
+            with timer.stage("triage"):
+                triage = self.triage.classify(image, self.ocr)
+            PAGE_TRIAGE.inc(category=triage.category)
+            if not triage.relevant:
+                print(f"Page {page_num}: skipped by triage ({triage.reason})")
+                PAGE_PATH.inc(path="skipped")
+                checkpoint.save(page_num, "skipped", reason=triage.reason)
+                return None
+        
+        key = None
+        if self.page_index.enabled:
+            with timer.stage("page_hash"):
+                key = (perceptual_hash(image), triage.signature if triage else None)
+        
+        # Steps 1-2: Preprocess + OCR
+        ocr_data, raw_text, page_width = self._ocr_page(image, page_num, timer)
+        del image
+        
+        # Repeated pages (copies, re-scans, re-uploads) reuse earlier results. Pages
+        # of one layout hash alike, so a repeat also needs the same OCR text.
+        if key:
+            original = doc.duplicate_of(*key, raw_text)
+            if original:
+                print(f"Page {page_num}: duplicate of page {original}, skipped")
+                PAGE_PATH.inc(path="duplicate")
+                CACHE_HITS.inc(cache="page_duplicate")
+                checkpoint.save(page_num, "skipped", reason=f"duplicate of page {original}")
+                return None
+            doc.seen.append(key + (str(page_num), raw_text))
+            cached = self.page_index.lookup(*key, raw_text)
+            if cached:
+                print(f"Page {page_num}: matches a recently processed page, reusing its results")
+                PAGE_PATH.inc(path="page_cache")
+                CACHE_HITS.inc(cache="page_hash")
+                # Only the items are reused; reconciliation checks them against this page's own text
+                lines = self._group_lines(ocr_data)
+                page = PageData(page_no=str(page_num), page_type=cached.page_type,
+                                bill_items=list(cached.items))
+                doc.add(page, raw_text, lines, key, slow_path=cached.slow_path)
+                checkpoint.save(page_num, "done", raw_text=raw_text, lines=lines,
+                                page_type=cached.page_type, items=items_to_records(cached.items),
+                                slow_path=cached.slow_path, key=key)
+                PAGES_PROCESSED.inc()
+                return None
+        
+        triage_type = triage.page_type if triage else None
+        checkpoint.save(page_num, "ocr", ocr_data=ocr_data, raw_text=raw_text, page_width=page_width,
+                        key=key, triage_page_type=triage_type)
+        return ocr_data, raw_text, page_width, key, triage_type
+
+    def _restore_page(self, page_num: int, saved: Dict[str, Any], doc: DocumentPages):
+        """
+        Add a page finished by an earlier attempt of this document, at no
+        OCR or LLM cost.
+        """
+        CACHE_HITS.inc(cache="checkpoint")
+        PAGE_PATH.inc(path="checkpoint")
+        if saved["status"] == "skipped":
+            print(f"Page {page_num}: skipped in an earlier attempt ({saved.get('reason')})")
+            return
+        print(f"Page {page_num}: restored from checkpoint")
+        key = _checkpoint_key(saved)
+        if key:
+            doc.seen.append(key + (str(page_num), saved["raw_text"]))
+        page = PageData(page_no=str(page_num), page_type=saved["page_type"],
+                        bill_items=LineItem.bulk_from_clean(saved["items"]))
+        doc.add(page, saved["raw_text"], saved["lines"], key, slow_path=saved["slow_path"])
+
+    def _ocr_page(self, image: np.ndarray, page_num: int,
+                  timer: StageTimer) -> Tuple[List[Dict[str, Any]], str, int]:
+        """
+        Steps 1-2 for one page. Pages whose size was unknown before rendering
+        are downsampled here if they came out above MAX_PAGE_MEGAPIXELS.
+        Returns (ocr_data, raw_text, page_width).
+        """
+        height, width = image.shape[:2]
+        if height * width > MAX_PAGE_MEGAPIXELS * 1e6:
+            print(f"Page {page_num}: downsampling {width}x{height} to {MAX_PAGE_MEGAPIXELS} MP")
+            image = self.preprocessor.downsample(image, MAX_PAGE_MEGAPIXELS)
+            PAGES_DOWNSAMPLED.inc()
+        
+        # Step 1: Preprocess
+        with timer.stage("preprocess"):
+            processed_image = self.preprocessor.preprocess(image)
+        
+        # Step 2: OCR + Layout extraction
+        with timer.stage("ocr"):
+            ocr_data = self.ocr.extract_data(processed_image)
+            raw_text = self.ocr.extract_text(processed_image)
+        return ocr_data, raw_text, processed_image.shape[1]
+
+    def _run_slow_path(self, lines: List[List[Dict[str, Any]]], raw_text: str, page_num: int,
+                       timer: StageTimer, compaction: Dict[str, int],
+                       deadline: Optional[Deadline] = None) -> List[LineItem]:
+        """
+        Step 4: reconstruct a page's rows with the LLM from its compacted text.
+        """
+        with timer.stage("compact"):
+            compacted = compact_page(lines, raw_text)
+        self._record_compaction(compaction, compacted, page_num)
+        
+        rows = []
+        # Rows are collected as they stream in (a cut-off response keeps what
+        # arrived) and validated in one batch
+        with timer.stage("llm"):
+            for d in self.llm.stream_table(compacted.text, max_tokens=compacted.max_tokens, deadline=deadline):
+                rows.append(d)
+        return LineItem.bulk_from_clean(rows)
+
+    @staticmethod
+    def _reconcile_outcome(report: Dict[str, Any]) -> str:
+        if report["matched"]:
+            return "fixed" if report["reextracted_pages"] else "matched"
+        return "mismatch" if report["document_total"] else "no_total"
+
+    def _record_compaction(self, totals: Dict[str, int], compacted: CompactedText, page_num: int):
+        """
+        Add a page's before/after prompt token estimates to the request totals and metrics.
+        """
+        totals["tokens_before"] += compacted.tokens_before
+        totals["tokens_after"] += compacted.tokens_after
+        PROMPT_TOKENS.inc(compacted.tokens_before, phase="before")
+        PROMPT_TOKENS.inc(compacted.tokens_after, phase="after")
+        print(f"Page {page_num}: prompt compacted from ~{compacted.tokens_before} to "
+              f"~{compacted.tokens_after} tokens, max_tokens={compacted.max_tokens}")
+
+    def _finish_timings(self, timer: StageTimer, start: float) -> Dict[str, float]:
+        """
+        Record the end-to-end duration and return the per-stage timings.
+        """
+        elapsed = time.perf_counter() - start
+        REQUEST_SECONDS.observe(elapsed)
+        timings = {stage: round(seconds, 4) for stage, seconds in timer.timings.items()}
+        timings["total"] = round(elapsed, 4)
+        return timings
+
     def _parse_ocr_to_items(self, ocr_data: List[Dict[str, Any]], page_num: int) -> List[LineItem]:
         """
         Heuristic parser to extract line items from OCR data.
         This is a basic implementation that looks for patterns.
         """
-        items = []
-        
-        # Group OCR data by vertical position (y-coordinate)
+        return self._parse_lines_to_items(self._group_lines(ocr_data))
+
+    def _group_lines(self, ocr_data: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Group OCR words into lines by vertical position (y-coordinate).
+        Lines are returned top to bottom, words left to right.
+        """
         lines = {}
         for word_data in ocr_data:
             text = word_data['text'].strip()
-            if not text or len(text) < 2:
+            if not text:
                 continue
                 
             bbox = word_data['bbox']
@@ -127,26 +518,36 @@ class ExtractionPipeline:
             if not found_line:
                 lines[y_pos] = [word_data]
         
-        # Sort lines by y-position
-        sorted_lines = sorted(lines.items(), key=lambda x: x[0])
-        
-        # Try to extract items from each line
-        for y_pos, words in sorted_lines:
-            # Sort words by x-position
+        # Sort lines by y-position, words by x-position
+        sorted_lines = []
+        for y_pos, words in sorted(lines.items(), key=lambda x: x[0]):
             words.sort(key=lambda w: w['bbox'][0])
-            line_text = ' '.join([w['text'] for w in words])
+            sorted_lines.append(words)
+        return sorted_lines
+
+    def _parse_lines_to_items(self, lines: List[List[Dict[str, Any]]]) -> List[LineItem]:
+        """
+        Try to extract an item from each grouped line. Rows are collected as
+        dicts and validated in one batch for the page.
+        """
+        rows = []
+        for words in lines:
+            # Single characters are mostly OCR noise for the heuristic
+            line_text = ' '.join([w['text'] for w in words if len(w['text'].strip()) >= 2])
+            if not line_text:
+                continue
             
             # Look for patterns: item name, quantity, rate, amount
             # This is a simplified heuristic
-            item = self._extract_item_from_line(line_text)
-            if item:
-                items.append(item)
+            row = self._extract_item_from_line(line_text)
+            if row:
+                rows.append(row)
         
-        return items
+        return LineItem.bulk_from_clean(rows)
 
-    def _extract_item_from_line(self, line_text: str) -> Optional[LineItem]:
+    def _extract_item_from_line(self, line_text: str) -> Optional[Dict[str, Any]]:
         """
-        Extract item details from a single line of text.
+        Extract item details (a LineItem dict) from a single line of text.
         Returns None if no valid item found.
         """
         # Skip header lines
@@ -171,12 +572,12 @@ class ExtractionPipeline:
             if not item_name or len(item_name) < 3:
                 return None
             
-            return LineItem(
-                item_name=item_name,
-                item_quantity=item_quantity,
-                item_rate=item_rate,
-                item_amount=item_amount
-            )
+            return {
+                'item_name': item_name,
+                'item_quantity': item_quantity,
+                'item_rate': item_rate,
+                'item_amount': item_amount
+            }
         except:
             return None
 
@@ -184,32 +585,4 @@ class ExtractionPipeline:
         """
         Classify page type based on content.
         """
-        text_lower = text.lower()
-        
-        if 'pharmacy' in text_lower or 'medicine' in text_lower or 'drug' in text_lower:
-            return "Pharmacy"
-        elif 'final' in text_lower and 'total' in text_lower:
-            return "Final Bill"
-        else:
-            return "Bill Detail"
-
-    def _extract_total(self, text: str) -> float:
-        """
-        Extract the final total from bill text.
-        """
-        # Look for patterns like "Total: 1234.56" or "Grand Total: 1234.56"
-        patterns = [
-            r'(?:grand\s+)?total[:\s]+(?:rs\.?|₹)?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',
-            r'(?:net\s+)?amount[:\s]+(?:rs\.?|₹)?\s*(\d+(?:,\d{3})*(?:\.\d{2})?)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text.lower())
-            if match:
-                amount_str = match.group(1).replace(',', '')
-                try:
-                    return float(amount_str)
-                except:
-                    pass
-        
-        return 0.0
+        return classify_page_type(text)
@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from ..validation.models import LineItem
+
+# Set PAGE_INDEX=0 to disable duplicate-page detection
+PAGE_INDEX_ENABLED = os.environ.get("PAGE_INDEX", "1") == "1"
+# Recent pages kept for reuse across documents
+PAGE_INDEX_MAX = int(os.environ.get("PAGE_INDEX_MAX", "256"))
+# Max differing bits (of 64) for two page hashes to count as the same page
+PAGE_HASH_DISTANCE = int(os.environ.get("PAGE_HASH_DISTANCE", "6"))
+# Min word similarity (0-1) of two pages' OCR text, on top of identical numbers
+PAGE_TEXT_SIMILARITY = float(os.environ.get("PAGE_TEXT_SIMILARITY", "0.9"))
+
+Signature = Optional[Tuple[str, ...]]
+
+WORD_RE = re.compile(r'\w+')
+NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """
+    64-bit DCT perceptual hash: low frequencies of a 32x32 grayscale copy,
+    thresholded at their median. Robust to rescans, scaling and small
+    brightness changes.
+    """
+    import cv2
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    median = np.median(low[1:])  # The DC term only carries overall brightness
+    value = 0
+    for bit in low > median:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def same_page(hash_a: int, signature_a: Signature, hash_b: int, signature_b: Signature,
+              max_distance: int = PAGE_HASH_DISTANCE) -> bool:
+    """
+    Candidate repeat: close hashes and, when both pages were triaged, the
+    same amounts read from their thumbnails. Pages of one layout hash only
+    a few bits apart, so a candidate is only a repeat if same_text agrees.
+    """
+    if hamming_distance(hash_a, hash_b) > max_distance:
+        return False
+    if signature_a is not None and signature_b is not None:
+        return signature_a == signature_b
+    return True
+
+
+def same_text(text_a: str, text_b: str, min_similarity: float = PAGE_TEXT_SIMILARITY) -> bool:
+    """
+    Whether two pages' OCR texts show the same content: exactly the same
+    numbers in the same order, and nearly the same words (re-scans shift
+    a few OCR characters). Pages without any text are never the same.
+    """
+    words_a, words_b = WORD_RE.findall(text_a.lower()), WORD_RE.findall(text_b.lower())
+    if not words_a or not words_b:
+        return False
+    if NUMBER_RE.findall(text_a) != NUMBER_RE.findall(text_b):
+        return False
+    return SequenceMatcher(None, words_a, words_b, autojunk=False).ratio() >= min_similarity
+
+
+def text_digest(text: str) -> str:
+    """
+    Short digest of a page's OCR text, keeping same-layout pages apart in the index.
+    """
+    return hashlib.sha1(' '.join(WORD_RE.findall(text.lower())).encode("utf-8")).hexdigest()[:16]
+
+
+class CachedPage:
+    """
+    Everything the pipeline produced for a page after OCR, so a repeat of
+    the page skips parsing and the LLM.
+    """
+
+    def __init__(self, phash: int, signature: Signature, raw_text: str, page_width: int,
+                 lines: List[List[Dict[str, Any]]], items: List[LineItem], page_type: str,
+                 slow_path: bool = False):
+        self.phash = phash
+        self.signature = signature
+        self.raw_text = raw_text
+        self.page_width = page_width
+        self.lines = lines
+        self.items = items
+        self.page_type = page_type
+        self.slow_path = slow_path
+
+    @property
+    def key(self) -> Tuple[int, Signature, str]:
+        return self.phash, self.signature, text_digest(self.raw_text)
+
+
+class PageHashIndex:
+    """
+    Bounded LRU index of recently processed pages, looked up by perceptual
+    hash and confirmed on the OCR text. Shared across requests so
+    re-uploaded bundles and repeated pages of recent documents are not
+    parsed or sent to the LLM again.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_distance: Optional[int] = None,
+                 enabled: bool = PAGE_INDEX_ENABLED):
+        self.max_entries = max_entries or PAGE_INDEX_MAX
+        self.max_distance = PAGE_HASH_DISTANCE if max_distance is None else max_distance
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[int, Signature, str], CachedPage]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, phash: int, signature: Signature, raw_text: str) -> Optional[CachedPage]:
+        """
+        A recent page with a close hash and the same OCR text; never the hash alone.
+        """
+        with self._lock:
+            entry = self._find(phash, signature, raw_text)
+            if entry is not None:
+                self._entries.move_to_end(entry.key)
+            return entry
+
+    def _find(self, phash: int, signature: Signature, raw_text: str) -> Optional[CachedPage]:
+        entry = self._entries.get((phash, signature, text_digest(raw_text)))
+        if entry is None:
+            # Scanning a few hundred ints is far cheaper than a parse or LLM call
+            entry = next((e for e in self._entries.values()
+                          if same_page(phash, signature, e.phash, e.signature, self.max_distance)
+                          and same_text(raw_text, e.raw_text)), None)
+        return entry
+
+    def add(self, entry: CachedPage):
+        with self._lock:
+            key = entry.key
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def update_items(self, phash: int, signature: Signature, raw_text: str, items: List[LineItem]):
+        """
+        Replace a page's items after reconciliation re-extracted it. The page
+        may have matched its entry on a close hash and text, so it is found
+        the same way as in lookup.
+        """
+        with self._lock:
+            entry = self._find(phash, signature, raw_text)
+            if entry is not None:
+                entry.items = items
+                entry.slow_path = True
+
+
+_index: Optional[PageHashIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_page_index() -> PageHashIndex:
+    """
+    Process-wide page index, so every pipeline instance shares it.
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PageHashIndex()
+        return _index
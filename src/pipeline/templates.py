@@ -0,0 +1,281 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from ..validation.models import LineItem
+from ..utils.table_header import HEADER_FIELDS, Line, find_header, normalize_word
+
+TEMPLATE_STORE_PATH = os.environ.get(
+    "TEMPLATE_STORE", os.path.join(tempfile.gettempdir(), "bill_templates.json"))
+TEMPLATE_MAX = int(os.environ.get("TEMPLATE_MAX", "2000"))
+# Min seconds between saves of template hit counts (new layouts are saved at once)
+TEMPLATE_SAVE_INTERVAL = float(os.environ.get("TEMPLATE_SAVE_INTERVAL", "60"))
+# Max drift of a header column (fraction of page width) for a layout to match
+POSITION_TOLERANCE = 0.03
+# Share of amounts the geometric parse must reproduce before a template is kept
+MIN_AGREEMENT = 0.8
+
+SKIP_ROW_KEYWORDS = ("total", "subtotal", "balance", "discount", "tax", "gst")
+
+
+def _to_number(text: str) -> Optional[float]:
+    clean = text.replace(',', '').replace('₹', '').replace('$', '').strip()
+    if not re.fullmatch(r'\d+(?:\.\d+)?', clean):
+        return None
+    return float(clean)
+
+
+def _x_center(word: Dict[str, Any], page_width: float) -> float:
+    x, _, w, _ = word['bbox']
+    return (x + w / 2) / page_width
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock shared by every worker process writing the store.
+    POSIX only; elsewhere saves are not serialized across processes.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def fingerprint(header: Line, page_width: float) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Layout key (normalized header tokens) and column anchors
+    (field + relative x-center) derived from a header line.
+    """
+    tokens = [normalize_word(w['text']) for w in header]
+    key = "|".join(t for t in tokens if t)
+
+    positions: Dict[str, List[float]] = {}
+    for word in header:
+        token = normalize_word(word['text'])
+        for field, keys in HEADER_FIELDS.items():
+            if token in keys:
+                positions.setdefault(field, []).append(_x_center(word, page_width))
+                break
+    columns = [{"field": field, "x": round(sum(xs) / len(xs), 4)} for field, xs in positions.items()]
+    columns.sort(key=lambda c: c["x"])
+    return key, columns
+
+
+def parse_rows(columns: List[Dict[str, Any]], lines: List[Line], page_width: float) -> List[LineItem]:
+    """
+    Parse table rows geometrically: each word goes to the column whose
+    span (midpoints between neighbouring header anchors) contains it.
+    """
+    bounds = [(columns[i]["x"] + columns[i + 1]["x"]) / 2 for i in range(len(columns) - 1)]
+    rows = []
+    for words in lines:
+        cells: Dict[str, List[str]] = {}
+        for word in words:
+            x = _x_center(word, page_width)
+            col = sum(1 for b in bounds if x > b)
+            cells.setdefault(columns[col]["field"], []).append(word['text'])
+
+        name = ' '.join(cells.get("item_name", [])).strip()
+        if len(normalize_word(name)) < 3 or any(k in name.lower() for k in SKIP_ROW_KEYWORDS):
+            continue
+
+        values = {}
+        for field in ("item_quantity", "item_rate", "item_amount"):
+            for text in cells.get(field, []):
+                number = _to_number(text)
+                if number is not None:
+                    values[field] = number
+                    break
+        if "item_amount" not in values:
+            continue
+
+        rows.append({
+            "item_name": name,
+            "item_quantity": values.get("item_quantity", 1.0),
+            "item_rate": values.get("item_rate", values["item_amount"]),
+            "item_amount": values["item_amount"]
+        })
+    return LineItem.bulk_from_clean(rows)
+
+
+class LayoutTemplateStore:
+    """
+    Persistent cache of learned column maps, keyed by header fingerprint.
+    Vendors often share header words, so each key holds a list of layouts
+    told apart by their column positions. Pages matching a known layout
+    are parsed geometrically, skipping the heuristic parser and the LLM.
+    Several worker processes share the store file: each save merges what
+    the others wrote under a file lock.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_templates: Optional[int] = None,
+                 save_interval: Optional[float] = None):
+        self.path = path or TEMPLATE_STORE_PATH
+        self.max_templates = max_templates or TEMPLATE_MAX
+        self.save_interval = TEMPLATE_SAVE_INTERVAL if save_interval is None else save_interval
+        self._lock = threading.Lock()
+        self._templates: Dict[str, Dict[str, Any]] = self._load()
+        # Hits per layout (by id) since the last save, added to the stored counts on merge
+        self._unsaved_hits: Dict[int, int] = {}
+        self._last_save = time.time()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                templates = json.load(f)
+        except Exception as e:
+            print(f"Error loading template store: {e}")
+            return {}
+        # Stores written before layouts were listed per key hold a single column map
+        return {key: entry if "layouts" in entry else {"layouts": [entry]}
+                for key, entry in templates.items()}
+
+    def _merge(self, stored: Dict[str, Dict[str, Any]]):
+        """
+        Add layouts other workers saved, and their hits, to this store's.
+        """
+        for key, entry in stored.items():
+            for layout in entry["layouts"]:
+                mine = self._find_layout(key, layout["columns"])
+                if mine is None:
+                    self._templates.setdefault(key, {"layouts": []})["layouts"].append(layout)
+                    continue
+                mine["hits"] = layout.get("hits", 0) + self._unsaved_hits.get(id(mine), 0)
+                mine["last_used"] = max(mine.get("last_used", 0), layout.get("last_used", 0))
+
+    def _save(self):
+        """
+        Merge the store file into memory and write it back, under the file lock.
+        Call with self._lock held.
+        """
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with _file_lock(self.path + ".lock"):
+            self._merge(self._load())
+            while len(self) > self.max_templates:
+                self._evict_oldest()
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._templates, f)
+            os.replace(tmp_path, self.path)
+        self._unsaved_hits.clear()
+        self._last_save = time.time()
+
+    def __len__(self) -> int:
+        return sum(len(entry["layouts"]) for entry in self._templates.values())
+
+    def _find_layout(self, key: str, columns: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        entry = self._templates.get(key)
+        if entry is None:
+            return None
+        for layout in entry["layouts"]:
+            if self._same_columns(layout["columns"], columns):
+                return layout
+        return None
+
+    def match(self, lines: List[Line], page_width: float) -> Optional[List[LineItem]]:
+        """
+        Parse the page with a stored template if its layout matches.
+        Returns None when no template applies or it yields nothing.
+        """
+        header_idx = find_header(lines)
+        if header_idx is None:
+            return None
+        key, columns = fingerprint(lines[header_idx], page_width)
+        template = self._find_layout(key, columns)
+        if template is None:
+            return None
+
+        items = parse_rows(template["columns"], lines[header_idx + 1:], page_width)
+        if not items:
+            return None
+        with self._lock:
+            template["hits"] = template.get("hits", 0) + 1
+            template["last_used"] = time.time()
+            self._unsaved_hits[id(template)] = self._unsaved_hits.get(id(template), 0) + 1
+            # Usage is saved too, so eviction after a restart goes by last use
+            if time.time() - self._last_save >= self.save_interval:
+                try:
+                    self._save()
+                except Exception as e:
+                    print(f"Error saving template store: {e}")
+        return items
+
+    def learn(self, lines: List[Line], page_width: float, items: List[LineItem]) -> bool:
+        """
+        Store the page's column map if parsing it geometrically reproduces
+        the items extracted by the fast or slow path.
+        """
+        if not items:
+            return False
+        header_idx = find_header(lines)
+        if header_idx is None:
+            return False
+        key, columns = fingerprint(lines[header_idx], page_width)
+        if self._find_layout(key, columns) is not None:
+            return False
+
+        parsed = parse_rows(columns, lines[header_idx + 1:], page_width)
+        expected = [round(item.item_amount, 2) for item in items]
+        matched = 0
+        for item in parsed:
+            amount = round(item.item_amount, 2)
+            if amount in expected:
+                expected.remove(amount)
+                matched += 1
+        if not parsed or matched < MIN_AGREEMENT * len(items) or matched < MIN_AGREEMENT * len(parsed):
+            return False
+
+        with self._lock:
+            entry = self._templates.setdefault(key, {"layouts": []})
+            entry["layouts"].append({"columns": columns, "hits": 0, "last_used": time.time()})
+            if len(self) > self.max_templates:
+                self._evict_oldest()
+            try:
+                self._save()
+            except Exception as e:
+                print(f"Error saving template store: {e}")
+        return True
+
+    def _evict_oldest(self):
+        oldest_key, oldest = min(((key, layout) for key, entry in self._templates.items()
+                                  for layout in entry["layouts"]), key=lambda kl: kl[1]["last_used"])
+        layouts = self._templates[oldest_key]["layouts"]
+        layouts.remove(oldest)
+        if not layouts:
+            del self._templates[oldest_key]
+
+    @staticmethod
+    def _same_columns(stored: List[Dict[str, Any]], seen: List[Dict[str, Any]]) -> bool:
+        if [c["field"] for c in stored] != [c["field"] for c in seen]:
+            return False
+        return all(abs(a["x"] - b["x"]) <= POSITION_TOLERANCE for a, b in zip(stored, seen))
+
+
+_store: Optional[LayoutTemplateStore] = None
+_store_lock = threading.Lock()
+
+
+def get_template_store() -> LayoutTemplateStore:
+    """
+    Process-wide template store, so every pipeline instance shares it.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LayoutTemplateStore()
+        return _store
@@ -0,0 +1,185 @@
+import os
+import re
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from ..ocr.engine import OCREngine
+from ..utils.image_processing import ImagePreprocessor
+
+# Set TRIAGE=0 to run every page through full OCR
+TRIAGE_ENABLED = os.environ.get("TRIAGE", "1") == "1"
+# Size of the thumbnail OCRed for triage (A4 at ~100 DPI is ~1 MP)
+TRIAGE_MEGAPIXELS = float(os.environ.get("TRIAGE_MEGAPIXELS", "1.0"))
+# Below this many words the thumbnail is unreadable and the page is kept
+TRIAGE_MIN_WORDS = 8
+# Pages with this many rows ending in a right-hand amount are never dropped
+TRIAGE_AMOUNT_ROWS = 3
+
+# A whole word that is an amount, with or without paise (bills often print "350")
+AMOUNT_RE = re.compile(r'^(?:rs\.?|₹)?(\d[\d,]*(?:\.\d{1,2})?)/?-?$', re.IGNORECASE)
+NUMBER_RE = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+BILL_KEYWORDS = ("bill", "invoice", "receipt", "amount", "amt", "rate", "qty", "quantity",
+                 "mrp", "charges", "payable", "total", "gst", "rs.", "₹")
+IRRELEVANT_KEYWORDS = ("discharge summary", "diagnosis", "chief complaint", "history of",
+                       "clinical", "investigation", "reference range", "biological ref",
+                       "specimen", "lab report", "laboratory", "radiology", "impression",
+                       "prescription", "aadhaar", "date of birth", "government of india",
+                       "identity card", "passport")
+
+
+def classify_page_type(text: str) -> str:
+    """
+    Page type from keywords; shared by triage and the full-resolution pass.
+    """
+    text_lower = text.lower()
+    
+    if 'pharmacy' in text_lower or 'medicine' in text_lower or 'drug' in text_lower:
+        return "Pharmacy"
+    elif 'final' in text_lower and 'total' in text_lower:
+        return "Final Bill"
+    else:
+        return "Bill Detail"
+
+
+class TriageResult:
+    """
+    Outcome of triaging one page: category is bill, pharmacy, final,
+    irrelevant, or unknown when the thumbnail could not be read.
+    """
+    PAGE_TYPES = {"bill": "Bill Detail", "pharmacy": "Pharmacy", "final": "Final Bill"}
+
+    def __init__(self, category: str, reason: str = "", features: Optional[Dict[str, Any]] = None):
+        self.category = category
+        self.reason = reason
+        self.features = features or {}
+
+    @property
+    def relevant(self) -> bool:
+        return self.category != "irrelevant"
+
+    @property
+    def page_type(self) -> Optional[str]:
+        return self.PAGE_TYPES.get(self.category)
+
+    @property
+    def signature(self) -> Optional[Tuple[str, ...]]:
+        """
+        Amounts read from the thumbnail, used to tell apart pages that look alike.
+        """
+        if self.category == "unknown":
+            return None
+        return tuple(self.features.get("amounts", ()))
+
+
+def _rows(words: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Group thumbnail words into rows by vertical centre.
+    """
+    words = sorted(words, key=lambda w: w['bbox'][1] + w['bbox'][3] / 2)
+    heights = sorted(w['bbox'][3] for w in words)
+    tolerance = max(heights[len(heights) // 2] / 2, 2) if heights else 2
+    rows, last_y = [], None
+    for word in words:
+        y = word['bbox'][1] + word['bbox'][3] / 2
+        if last_y is None or y - last_y > tolerance:
+            rows.append([])
+        rows[-1].append(word)
+        last_y = y
+    return rows
+
+
+def layout_features(words: List[Dict[str, Any]], page_width: int) -> Dict[str, Any]:
+    """
+    Numeric layout of a page: rows carrying amounts (or several numbers),
+    the share of amounts in the right-hand columns, where bills keep their
+    rate/amount columns, and how many rows end in such an amount.
+    """
+    rows = _rows(words)
+    numeric_rows = 0
+    amount_rows = 0
+    amounts = []
+    right_amounts = 0
+    for row in rows:
+        text = ' '.join(w['text'] for w in row)
+        row_amounts = 0
+        right_of_row = False
+        for word in row:
+            match = AMOUNT_RE.match(word['text'].strip())
+            if match:
+                row_amounts += 1
+                amounts.append(match.group(1).replace(',', ''))
+                x, _, w, _ = word['bbox']
+                right_of_row = (x + w / 2) > 0.6 * page_width
+                right_amounts += right_of_row
+        if row_amounts or len(NUMBER_RE.findall(text)) >= 2:
+            numeric_rows += 1
+        if right_of_row:
+            amount_rows += 1
+    return {
+        "words": len(words),
+        "rows": len(rows),
+        "numeric_rows": numeric_rows,
+        "numeric_density": round(numeric_rows / len(rows), 3) if rows else 0.0,
+        "amount_column": round(right_amounts / len(amounts), 3) if amounts else 0.0,
+        "amount_rows": amount_rows,
+        "amounts": sorted(amounts),
+    }
+
+
+class PageTriage:
+    """
+    Classifies a page from a quick OCR of a downscaled thumbnail, so pages
+    that are not bills (discharge summaries, lab reports, ID scans) skip
+    preprocessing, full OCR and the LLM. Only pages with clear non-bill
+    evidence and no amount column are dropped; unreadable thumbnails keep
+    the page.
+    """
+
+    def __init__(self, enabled: bool = TRIAGE_ENABLED, max_megapixels: float = TRIAGE_MEGAPIXELS):
+        self.enabled = enabled
+        self.max_megapixels = max_megapixels
+        self.preprocessor = ImagePreprocessor()
+
+    def thumbnail(self, image: np.ndarray) -> np.ndarray:
+        small = self.preprocessor.downsample(image, self.max_megapixels)
+        if small.ndim == 3:
+            import cv2
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    @staticmethod
+    def has_amounts(features: Dict[str, Any]) -> bool:
+        """
+        Whether the page's numbers look like a bill: several rows ending in a
+        right-hand amount, or mostly numeric rows with an amount column or bill
+        keywords (lab reports are mostly numeric rows too).
+        """
+        if features["amount_rows"] >= TRIAGE_AMOUNT_ROWS and features["amount_column"] >= 0.5:
+            return True
+        if features["numeric_rows"] < 5 or features["numeric_density"] < 0.6:
+            return False
+        return features["amount_column"] >= 0.5 or bool(features.get("bill_keywords"))
+
+    def classify(self, image: np.ndarray, ocr: OCREngine) -> TriageResult:
+        thumb = self.thumbnail(image)
+        words = [w for w in ocr.extract_data(thumb) if w['text'].strip()]
+        features = layout_features(words, thumb.shape[1])
+        if len(words) < TRIAGE_MIN_WORDS:
+            return TriageResult("unknown", "thumbnail unreadable", features)
+        
+        text = ' '.join(w['text'] for w in words).lower()
+        bill_hits = [k for k in BILL_KEYWORDS if k in text]
+        other_hits = [k for k in IRRELEVANT_KEYWORDS if k in text]
+        features.update(bill_keywords=bill_hits, other_keywords=other_hits)
+        
+        # Keywords alone never drop a page with an amount column: department
+        # headings (LABORATORY, RADIOLOGY) also appear on itemised bills
+        if not self.has_amounts(features):
+            if other_hits and len(other_hits) > len(bill_hits):
+                return TriageResult("irrelevant", f"non-bill keywords: {', '.join(other_hits)}", features)
+            if not bill_hits and features["numeric_rows"] == 0:
+                return TriageResult("irrelevant", "no bill keywords or amounts", features)
+        
+        page_type = classify_page_type(text)
+        category = {v: k for k, v in TriageResult.PAGE_TYPES.items()}[page_type]
+        return TriageResult(category, "", features)
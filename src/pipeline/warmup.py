@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+import numpy as np
+
+# Set WARMUP_LLM=0 to skip opening the LLM connection at startup
+WARMUP_LLM = os.environ.get("WARMUP_LLM", "1") == "1"
+# Steps that must succeed before the worker reports ready
+REQUIRED_STEPS = ("imports", "pipeline", "synthetic_page")
+
+
+def synthetic_page() -> np.ndarray:
+    """
+    Small white BGR page with one printed bill row, enough to exercise
+    preprocessing, OCR and parsing.
+    """
+    import cv2
+    page = np.full((120, 600, 3), 255, dtype=np.uint8)
+    cv2.putText(page, "Consultation 1 150.00 150.00", (10, 70),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0), 2)
+    return page
+
+
+class WarmupState:
+    """
+    Readiness of this worker; the API reports ready only after warm-up
+    finished with every required step succeeding.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Any] = {}
+
+    @property
+    def failed_steps(self) -> List[str]:
+        """
+        Required steps that failed or never ran, once warm-up has finished.
+        """
+        if self.finished_at is None:
+            return []
+        return [name for name in REQUIRED_STEPS if not self.steps.get(name, {}).get("ok")]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "steps": self.steps, "failed_steps": self.failed_steps}
+
+
+def warm_up(state: WarmupState) -> WarmupState:
+    """
+    Load heavy modules, start the OCR engine, open the LLM connection pool
+    and run one synthetic page through the fast path. The worker is ready
+    only if the imports, the pipeline and the synthetic page succeeded; a
+    failed LLM connection only leaves the first LLM call cold.
+    """
+    from .core import ExtractionPipeline
+
+    state.started_at = time.time()
+
+    def step(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+            state.steps[name] = {"ok": True, "seconds": round(time.perf_counter() - start, 4)}
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+            state.steps[name] = {"ok": False, "error": str(e)}
+
+    def imports():
+        import cv2
+        import pdf2image
+        import pytesseract
+        import groq
+
+    pipeline_holder = {}
+
+    def build_pipeline():
+        pipeline_holder["pipeline"] = ExtractionPipeline()
+
+    def llm_connection():
+        # Any cheap authenticated call opens and keeps the pooled TLS connection
+        pipeline_holder["pipeline"].llm.client.models.list()
+
+    def synthetic():
+        pipeline = pipeline_holder["pipeline"]
+        processed = pipeline.preprocessor.preprocess(synthetic_page())
+        ocr_data = pipeline.ocr.extract_data(processed)
+        pipeline.ocr.extract_text(processed)
+        pipeline._parse_lines_to_items(pipeline._group_lines(ocr_data))
+
+    step("imports", imports)
+    step("pipeline", build_pipeline)
+    if "pipeline" in pipeline_holder:
+        if WARMUP_LLM:
+            step("llm_connection", llm_connection)
+        step("synthetic_page", synthetic)
+
+    state.finished_at = time.time()
+    state.ready = not state.failed_steps
+    if not state.ready:
+        print(f"Warm-up failed, not ready: {', '.join(state.failed_steps)}")
+    print(f"Warm-up finished in {state.finished_at - state.started_at:.2f}s: {state.steps}")
+    return state
+
+
+def start_warmup(state: WarmupState) -> threading.Thread:
+    """
+    Run warm-up in the background so the server can answer health probes meanwhile.
+    """
+    thread = threading.Thread(target=warm_up, args=(state,), daemon=True, name="warmup")
+    thread.start()
+    return thread
@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+from typing import Optional
+from .metrics import CANCELLATIONS
+
+# Default time budget for one extraction request in seconds (0 disables)
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", "300"))
+
+
+class RequestCancelled(Exception):
+    """
+    Raised inside the pipeline once the request's deadline has passed or
+    the client went away.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request cancelled: {reason}")
+        self.reason = reason
+
+
+class Deadline:
+    """
+    Per-request deadline and cancellation flag. The pipeline checks it
+    between pages and stages, and while streaming from the LLM; the API
+    cancels it when the client disconnects.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        timeout = REQUEST_TIMEOUT if timeout is None else timeout
+        self.expires_at = time.monotonic() + timeout if timeout and timeout > 0 else None
+        self.reason: Optional[str] = None
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def for_request(cls, timeout: Optional[float] = None) -> "Deadline":
+        """
+        Deadline for a client-supplied timeout, which can shorten the
+        request's time budget but never extend it past REQUEST_TIMEOUT.
+        """
+        if timeout is None or timeout <= 0:
+            return cls()
+        if REQUEST_TIMEOUT > 0:
+            timeout = min(timeout, REQUEST_TIMEOUT)
+        return cls(timeout)
+
+    def cancel(self, reason: str = "disconnect"):
+        if not self._cancelled.is_set():
+            self.reason = reason
+            self._cancelled.set()
+            CANCELLATIONS.inc(reason=reason)
+
+    @property
+    def cancelled(self) -> bool:
+        if not self._cancelled.is_set() and self.expires_at is not None and time.monotonic() >= self.expires_at:
+            self.cancel("deadline")
+        return self._cancelled.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """
+        Seconds left before the deadline, or None when there is none.
+        """
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self):
+        if self.cancelled:
+            raise RequestCancelled(self.reason)
@@ -1,4 +1,3 @@
-import cv2
 import numpy as np
 
 class ImagePreprocessor:
@@ -6,6 +5,8 @@ class ImagePreprocessor:
         """
         Apply preprocessing to improve OCR accuracy.
         """
+        import cv2  # Heavy import, deferred until first use
+        
         # Convert to grayscale
         gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         
@@ -19,3 +20,18 @@ class ImagePreprocessor:
         # denoised = cv2.fastNlMeansDenoising(binary, None, 10, 7, 21)
         
         return binary
+
+    def downsample(self, image: np.ndarray, max_megapixels: float) -> np.ndarray:
+        """
+        Shrink the image (keeping aspect ratio) so it has at most max_megapixels.
+        """
+        height, width = image.shape[:2]
+        pixels = height * width
+        limit = max_megapixels * 1e6
+        if pixels <= limit:
+            return image
+        
+        import cv2
+        scale = (limit / pixels) ** 0.5
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
@@ -1,51 +1,121 @@
 import requests
 import tempfile
 import os
-from typing import List
-from pdf2image import convert_from_path
-import cv2
+import re
+from typing import Optional, Tuple
 import numpy as np
+from .deadline import Deadline, RequestCancelled
+
+# Resolution PDF pages are rendered at (pdf2image's default)
+PDF_DPI = int(os.environ.get("PDF_DPI", "200"))
+# Max seconds to connect to the document host, and to wait for each chunk
+DOWNLOAD_TIMEOUT = float(os.environ.get("DOWNLOAD_TIMEOUT", "30"))
+
+PAGE_SIZE_RE = re.compile(r'([\d.]+)\s*x\s*([\d.]+)\s*pts')
 
 class InputHandler:
-    def download_file(self, url: str) -> str:
+    def download_file(self, url: str, deadline: Optional[Deadline] = None) -> str:
         """
         Download file from URL to a temporary file.
-        Returns the path to the temporary file.
+        Returns the path to the temporary file. A stalled host times out
+        after DOWNLOAD_TIMEOUT (or what is left of the deadline), and a
+        cancelled request stops between chunks with RequestCancelled.
         """
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
+        timeout = DOWNLOAD_TIMEOUT
+        if deadline:
+            deadline.check()
+            if deadline.remaining() is not None:
+                timeout = min(timeout, max(deadline.remaining(), 0.001))
+        try:
+            response = requests.get(url, stream=True, timeout=timeout)
+            response.raise_for_status()
+        except requests.Timeout:
+            if deadline:
+                deadline.check()
+            raise
         
         # Infer extension or default to .pdf
         ext = os.path.splitext(url)[1]
         if not ext:
             ext = '.pdf' # Default assumption
             
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
-            for chunk in response.iter_content(chunk_size=8192):
-                tmp_file.write(chunk)
+        with response, tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp_file:
+            try:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if deadline:
+                        deadline.check()
+                    tmp_file.write(chunk)
+            except (RequestCancelled, requests.RequestException):
+                tmp_file.close()
+                os.remove(tmp_file.name)
+                if deadline:
+                    deadline.check()
+                raise
             return tmp_file.name
 
-    def load_pages(self, file_path: str) -> List[np.ndarray]:
+    def count_pages(self, file_path: str) -> int:
+        """
+        Number of pages in the file without rasterizing them.
+        """
+        if os.path.splitext(file_path)[1].lower() == '.pdf':
+            from pdf2image import pdfinfo_from_path  # Heavy import, deferred until first use
+            return int(pdfinfo_from_path(file_path)["Pages"])
+        return 1
+
+    def page_size(self, file_path: str, page_num: int) -> Optional[Tuple[int, int]]:
         """
-        Load file pages as images (numpy arrays).
-        Supports PDF and common image formats.
+        (width, height) in pixels a page renders at, read from the PDF page box
+        or the image header without decoding anything. None if unknown.
+        """
+        try:
+            if os.path.splitext(file_path)[1].lower() == '.pdf':
+                from pdf2image import pdfinfo_from_path  # Heavy import, deferred until first use
+                info = pdfinfo_from_path(file_path, first_page=page_num, last_page=page_num)
+                for key, value in info.items():
+                    match = PAGE_SIZE_RE.search(value) if key.startswith("Page") and key.endswith("size") else None
+                    if match:
+                        # Page boxes are in points (1/72 inch)
+                        return (round(float(match.group(1)) * PDF_DPI / 72),
+                                round(float(match.group(2)) * PDF_DPI / 72))
+                return None
+            from PIL import Image
+            with Image.open(file_path) as image:
+                return image.size
+        except Exception as e:
+            print(f"Could not read the size of page {page_num}: {e}")
+            return None
+
+    def load_page(self, file_path: str, page_num: int, scale: float = 1.0) -> Optional[np.ndarray]:
+        """
+        Rasterize a single page (1-based) as a BGR image, so long PDFs never
+        hold all of their pages in memory at once. A scale below 1 renders
+        the page smaller instead of shrinking a full-size render afterwards.
+        Returns None if unreadable.
         """
         ext = os.path.splitext(file_path)[1].lower()
-        images = []
         
         if ext == '.pdf':
-            # Convert PDF to images
             # Note: poppler_path might need to be configured if not in PATH
-            pil_images = convert_from_path(file_path)
-            for p_img in pil_images:
-                # Convert PIL to cv2 (RGB -> BGR)
-                open_cv_image = np.array(p_img) 
-                open_cv_image = open_cv_image[:, :, ::-1].copy() 
-                images.append(open_cv_image)
-        else:
-            # Assume it's an image
-            img = cv2.imread(file_path)
-            if img is not None:
-                images.append(img)
-                
-        return images
+            from pdf2image import convert_from_path  # Heavy import, deferred until first use
+            pil_images = convert_from_path(file_path, dpi=PDF_DPI * scale, first_page=page_num, last_page=page_num)
+            if not pil_images:
+                return None
+            # Convert PIL to cv2 (RGB -> BGR)
+            open_cv_image = np.array(pil_images[0].convert("RGB"))
+            return open_cv_image[:, :, ::-1].copy()
+        
+        # Assume it's an image
+        import cv2
+        if scale >= 1:
+            return cv2.imread(file_path)
+        # Decode at 1/2, 1/4 or 1/8 size where possible, then resize the rest of the way
+        reduction = max([f for f in (1, 2, 4, 8) if f <= 1 / scale])
+        flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+        image = cv2.imread(file_path, flags[reduction])
+        if image is None or reduction * scale >= 1:
+            return image
+        height, width = image.shape[:2]
+        factor = reduction * scale
+        return cv2.resize(image, (max(1, int(width * factor)), max(1, int(height * factor))),
+                          interpolation=cv2.INTER_AREA)
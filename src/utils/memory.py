@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Optional
+from .metrics import PIXELS_IN_FLIGHT, PIXEL_BUDGET, PAGES_WAITING, MEMORY_REJECTIONS
+
+# Total page pixels allowed in flight per worker. Each pixel costs roughly five
+# bytes while a page is processed (BGR page + grayscale + binary copies).
+MEMORY_BUDGET_MEGAPIXELS = float(os.environ.get("MEMORY_BUDGET_MEGAPIXELS", "200"))
+# Pages above this size are downsampled before processing (A4 at 300 DPI is ~8.7 MP)
+MAX_PAGE_MEGAPIXELS = float(os.environ.get("MAX_PAGE_MEGAPIXELS", "12"))
+# How long a page may wait for budget before the request is rejected
+MEMORY_QUEUE_TIMEOUT = float(os.environ.get("MEMORY_QUEUE_TIMEOUT", "30"))
+# Seconds a rejected client is told to wait (Retry-After) before trying again
+MEMORY_RETRY_AFTER = int(os.environ.get("MEMORY_RETRY_AFTER", "10"))
+
+
+class MemoryBudgetExceeded(Exception):
+    """
+    Raised when a page cannot get memory budget within the queue timeout.
+    """
+    pass
+
+
+class MemoryGovernor:
+    """
+    Admission control for pages in flight across all concurrent requests of
+    this worker. Pages reserve their pixel count before processing and wait
+    (up to the queue timeout) while the budget is used up.
+    """
+
+    def __init__(self, budget_pixels: int, queue_timeout: float = MEMORY_QUEUE_TIMEOUT):
+        self.budget_pixels = budget_pixels
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+        PIXEL_BUDGET.set(budget_pixels)
+        PIXELS_IN_FLIGHT.set(0)
+        PAGES_WAITING.set(0)
+
+    def acquire(self, pixels: int, timeout: Optional[float] = None):
+        if pixels > self.budget_pixels:
+            MEMORY_REJECTIONS.inc()
+            raise MemoryBudgetExceeded(
+                f"Page of {pixels / 1e6:.1f} MP exceeds the memory budget of {self.budget_pixels / 1e6:.1f} MP")
+
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+        with self._cond:
+            self.waiting += 1
+            PAGES_WAITING.set(self.waiting)
+            try:
+                while self.in_flight + pixels > self.budget_pixels:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        MEMORY_REJECTIONS.inc()
+                        raise MemoryBudgetExceeded(
+                            f"Memory budget busy ({self.in_flight / 1e6:.1f} of "
+                            f"{self.budget_pixels / 1e6:.1f} MP in flight), try again later")
+                    self._cond.wait(remaining)
+                self.in_flight += pixels
+                PIXELS_IN_FLIGHT.set(self.in_flight)
+            finally:
+                self.waiting -= 1
+                PAGES_WAITING.set(self.waiting)
+
+    def release(self, pixels: int):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - pixels)
+            PIXELS_IN_FLIGHT.set(self.in_flight)
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, pixels: int, timeout: Optional[float] = None) -> Iterator[None]:
+        self.acquire(pixels, timeout)
+        try:
+            yield
+        finally:
+            self.release(pixels)
+
+    def usage(self) -> Dict[str, Any]:
+        return {
+            "budget_megapixels": round(self.budget_pixels / 1e6, 2),
+            "in_flight_megapixels": round(self.in_flight / 1e6, 2),
+            "pages_waiting": self.waiting,
+        }
+
+
+_governor: Optional[MemoryGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_memory_governor() -> MemoryGovernor:
+    """
+    Process-wide governor shared by every pipeline instance.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor(int(MEMORY_BUDGET_MEGAPIXELS * 1e6))
+        return _governor
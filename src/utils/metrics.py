@@ -0,0 +1,280 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """
+    Escape a label value for the Prometheus text format.
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """
+        Sample lines of this metric, without the HELP and TYPE header.
+        """
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ] + self.collect()
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing counter.
+    """
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """
+    Cumulative histogram with fixed upper bounds.
+    """
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds all metrics of the process and renders them in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "bill_extraction_stage_seconds", "Time spent in each pipeline stage", ["stage"])
+REQUEST_SECONDS = REGISTRY.histogram(
+    "bill_extraction_request_seconds", "End-to-end document processing time")
+PAGES_PROCESSED = REGISTRY.counter(
+    "bill_extraction_pages_processed_total", "Pages run through the pipeline")
+PAGE_PATH = REGISTRY.counter(
+    "bill_extraction_page_path_total",
+    "Pages by extraction path (fast, llm, template, reconcile, skipped, duplicate, page_cache, checkpoint)",
+    ["path"])
+LLM_CALLS = REGISTRY.counter(
+    "bill_extraction_llm_calls_total", "LLM API calls", ["operation"])
+LLM_TOKENS = REGISTRY.counter(
+    "bill_extraction_llm_tokens_total", "LLM tokens consumed", ["direction"])
+PROMPT_TOKENS = REGISTRY.counter(
+    "bill_extraction_prompt_tokens_estimated_total",
+    "Estimated page-text tokens sent to the LLM before and after compaction", ["phase"])
+RECONCILIATIONS = REGISTRY.counter(
+    "bill_extraction_reconciliations_total",
+    "Documents by totals reconciliation outcome (matched, fixed, mismatch, no_total)", ["outcome"])
+PAGE_TRIAGE = REGISTRY.counter(
+    "bill_extraction_page_triage_total",
+    "Pages by triage category (bill, pharmacy, final, irrelevant, unknown)", ["category"])
+CACHE_HITS = REGISTRY.counter(
+    "bill_extraction_cache_hits_total", "Cache hits", ["cache"])
+PIXELS_IN_FLIGHT = REGISTRY.gauge(
+    "bill_extraction_pixels_in_flight", "Page pixels currently reserved by the memory governor")
+PIXEL_BUDGET = REGISTRY.gauge(
+    "bill_extraction_pixel_budget", "Total page pixels allowed in flight")
+PAGES_WAITING = REGISTRY.gauge(
+    "bill_extraction_pages_waiting_for_memory", "Pages queued for memory budget")
+PAGES_DOWNSAMPLED = REGISTRY.counter(
+    "bill_extraction_pages_downsampled_total", "Pages downsampled to the megapixel cap")
+MEMORY_REJECTIONS = REGISTRY.counter(
+    "bill_extraction_memory_rejections_total", "Pages rejected because the memory budget stayed full")
+CANCELLATIONS = REGISTRY.counter(
+    "bill_extraction_cancellations_total",
+    "Requests cancelled before finishing (deadline, disconnect)", ["reason"])
+ERRORS = REGISTRY.counter(
+    "bill_extraction_errors_total", "Errors raised while processing", ["stage"])
+
+
+def count_error(error: BaseException, stage: str):
+    """
+    Count an exception in ERRORS once, under the innermost stage it was
+    raised in, however many stages and handlers it passes through.
+    """
+    if getattr(error, "_error_stage", None) is not None:
+        return
+    ERRORS.inc(stage=stage)
+    try:
+        error._error_stage = stage
+    except AttributeError:
+        pass
+
+
+class StageTimer:
+    """
+    Collects per-request stage timings and feeds them into STAGE_SECONDS.
+    Repeated stages (e.g. OCR on every page) are summed. Every stage and
+    span is also kept in a tree (``spans``) for profiling.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict[str, Any]]:
+        """
+        Record a node in the span tree without touching the stage metrics.
+        """
+        node = {"name": name, "start": round(time.perf_counter() - self._origin, 4),
+                "duration": 0.0, "children": []}
+        if attrs:
+            node["attrs"] = attrs
+        (self._stack[-1]["children"] if self._stack else self.spans).append(node)
+        self._stack.append(node)
+        start = time.perf_counter()
+        try:
+            yield node
+        except Exception as e:
+            node["error"] = str(e)
+            raise
+        finally:
+            node["duration"] = round(time.perf_counter() - start, 4)
+            self._stack.pop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            with self.span(name):
+                yield
+        except Exception as e:
+            from .deadline import RequestCancelled  # deadline.py imports this module
+            # Cancellations (deadline, disconnect) are counted by CANCELLATIONS, not as errors
+            if not isinstance(e, RequestCancelled):
+                count_error(e, name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            STAGE_SECONDS.observe(elapsed, stage=name)
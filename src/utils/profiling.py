@@ -0,0 +1,195 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter as TallyCounter
+from typing import Any, Dict, List, Optional
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "bill_profiles"))
+# Requests slower than this are profiled automatically (0 disables)
+PROFILE_SLOW_SECONDS = float(os.environ.get("PROFILE_SLOW_SECONDS", "10"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "100"))
+SAMPLE_INTERVAL = 0.01
+
+
+class SamplingProfiler:
+    """
+    Low-overhead stack sampler for a single thread.
+    Cheap enough to run on every request so slow ones can be kept after the fact.
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: TallyCounter = TallyCounter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        """
+        Collapsed stacks (flamegraph format) and the hottest leaf frames.
+        """
+        leaves: TallyCounter = TallyCounter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "total_samples": sum(self.samples.values()),
+            "interval": self.interval,
+            "top_frames": leaves.most_common(limit),
+            "collapsed_stacks": [f"{stack} {count}" for stack, count in self.samples.most_common(limit)],
+        }
+
+
+class RequestProfiler:
+    """
+    Profiles one pipeline run. Uses cProfile when the caller asked for a
+    profile, otherwise a background sampler that is only persisted when the
+    run turns out to be slow.
+    """
+
+    def __init__(self, requested: bool = False, slow_threshold: float = PROFILE_SLOW_SECONDS):
+        self.requested = requested
+        self.slow_threshold = slow_threshold
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._start = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.requested or self.slow_threshold > 0
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.requested:
+            self._cprofile = cProfile.Profile()
+            try:
+                self._cprofile.enable()
+            except ValueError:
+                # Another profiler is active on this thread; fall back to sampling
+                self._cprofile = None
+        if self._cprofile is None and self.enabled:
+            self._sampler = SamplingProfiler(threading.get_ident())
+            self._sampler.start()
+
+    def stop(self, spans: List[Dict[str, Any]], **context) -> Optional[str]:
+        """
+        Stop profiling and persist the profile if it was requested or the run
+        exceeded the slow threshold. Returns the profile id if stored.
+        """
+        elapsed = time.perf_counter() - self._start
+        if self._cprofile:
+            self._cprofile.disable()
+        if self._sampler:
+            self._sampler.stop()
+
+        slow = self.slow_threshold > 0 and elapsed >= self.slow_threshold
+        if not (self.requested or slow):
+            return None
+
+        profile = {
+            "profile_id": uuid.uuid4().hex,
+            "created_at": time.time(),
+            "elapsed": round(elapsed, 4),
+            "trigger": "requested" if self.requested else "slow",
+            "spans": spans,
+            **context,
+        }
+        if self._cprofile:
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats("cumulative").print_stats(50)
+            profile["mode"] = "cprofile"
+            profile["stats"] = stream.getvalue()
+        elif self._sampler:
+            profile["mode"] = "sampling"
+            profile["stats"] = self._sampler.report()
+
+        try:
+            return ProfileStore().save(profile)
+        except Exception as e:
+            print(f"Error saving profile: {e}")
+            return None
+
+
+class ProfileStore:
+    """
+    Keeps profiles as JSON files in PROFILE_DIR, pruning the oldest ones.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_files: Optional[int] = None):
+        self.directory = directory or PROFILE_DIR
+        self.max_files = max_files or PROFILE_MAX_FILES
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def save(self, profile: Dict[str, Any]) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile["profile_id"]), "w") as f:
+            json.dump(profile, f, default=str)
+        self._prune()
+        return profile["profile_id"]
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        # Profile ids are uuid hex strings; reject anything that could escape the directory
+        if not profile_id.isalnum():
+            return None
+        path = self._path(profile_id)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def list(self) -> List[Dict[str, Any]]:
+        summaries = []
+        for name in self._files():
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    profile = json.load(f)
+            except Exception:
+                continue
+            summaries.append({key: profile.get(key) for key in
+                              ("profile_id", "created_at", "elapsed", "trigger", "mode", "url")})
+        return sorted(summaries, key=lambda p: p["created_at"] or 0, reverse=True)
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.endswith(".json")]
+
+    def _prune(self):
+        paths = [os.path.join(self.directory, name) for name in self._files()]
+        if len(paths) <= self.max_files:
+            return
+        paths.sort(key=os.path.getmtime)
+        for path in paths[:len(paths) - self.max_files]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
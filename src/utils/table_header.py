@@ -0,0 +1,29 @@
+import re
+from typing import List, Dict, Any, Optional
+
+# Header words naming each line-item column
+HEADER_FIELDS = {
+    "item_name": {"description", "particulars", "item", "items", "service", "services", "details", "name", "product"},
+    "item_quantity": {"qty", "quantity", "units", "nos"},
+    "item_rate": {"rate", "price", "mrp"},
+    "item_amount": {"amount", "amt", "total", "value"},
+}
+
+Line = List[Dict[str, Any]]
+
+
+def normalize_word(text: str) -> str:
+    return re.sub(r'[^a-z]', '', text.lower())
+
+
+def find_header(lines: List[Line]) -> Optional[int]:
+    """
+    Index of the first line that looks like a table header
+    (has an item-name column and an amount column).
+    """
+    for idx, words in enumerate(lines):
+        fields = {field for word in words for field, keys in HEADER_FIELDS.items()
+                  if normalize_word(word['text']) in keys}
+        if "item_name" in fields and "item_amount" in fields:
+            return idx
+    return None
@@ -29,7 +29,7 @@ class Validator:
         
         return unique_items
 
-    def validate_math(self, invoice: Invoice) -> bool:
+    def validate_math(self, invoice: Invoice, tolerance: float = 0.05) -> bool:
         """
         Check if calculated total matches extracted total.
         """
@@ -37,5 +37,5 @@ class Validator:
             return False
             
         calculated = invoice.calculated_total
-        # Allow small floating point difference
-        return abs(calculated - invoice.total_amount) < 0.05
+        # Allow small floating point / rounding difference
+        return abs(calculated - invoice.total_amount) < tolerance
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, Field, validator
-from typing import Optional, List, Literal
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import Optional, List, Literal, Dict, Any, Iterable
+
+PYDANTIC_V2 = hasattr(BaseModel, 'model_construct')
+NUMERIC_FIELDS = ('item_rate', 'item_quantity', 'item_amount')
 
 class TokenUsage(BaseModel):
     total_tokens: int = 0
@@ -30,6 +33,53 @@ class LineItem(BaseModel):
                 return 0.0
         return v
 
+    @classmethod
+    def from_clean(cls, data: Dict[str, Any]) -> "LineItem":
+        """
+        Build an item from already-clean parser/LLM output (str name, numeric
+        fields). On pydantic v1 validation is pure Python, so clean rows are
+        constructed directly; on v2 the compiled validator is already faster.
+        """
+        if not PYDANTIC_V2 and _is_clean(data):
+            fields = {'item_name': data['item_name']}
+            fields.update((field, float(data[field])) for field in NUMERIC_FIELDS)
+            return cls.construct(**fields)
+        return cls(**data)
+
+    @classmethod
+    def bulk_from_clean(cls, rows: Iterable[Dict[str, Any]]) -> List["LineItem"]:
+        """
+        Batch creation for large bills: one validator call for the whole
+        list on pydantic v2. Rows that fail validation are skipped.
+        """
+        rows = list(rows)
+        if PYDANTIC_V2:
+            try:
+                return _line_item_list_adapter().validate_python(rows)
+            except ValidationError:
+                pass  # Fall back to per-row so one bad row doesn't drop the batch
+        items = []
+        for row in rows:
+            try:
+                items.append(cls.from_clean(row))
+            except ValidationError as e:
+                print(f"Error creating LineItem: {e}, data: {row}")
+        return items
+
+def _is_clean(data: Dict[str, Any]) -> bool:
+    return isinstance(data.get('item_name'), str) and all(
+        isinstance(data.get(field), (int, float)) and not isinstance(data.get(field), bool)
+        for field in NUMERIC_FIELDS)
+
+_item_list_adapter = None
+
+def _line_item_list_adapter():
+    global _item_list_adapter
+    if _item_list_adapter is None:
+        from pydantic import TypeAdapter
+        _item_list_adapter = TypeAdapter(List[LineItem])
+    return _item_list_adapter
+
 class PageData(BaseModel):
     page_no: str
     page_type: Literal["Bill Detail", "Final Bill", "Pharmacy"] = "Bill Detail"
@@ -44,6 +94,13 @@ class APIResponse(BaseModel):
     token_usage: TokenUsage
     data: Optional[ExtractedData] = None
     error: Optional[str] = None
+    # Per-stage timings in seconds, only filled when the request asks for them
+    stage_timings: Optional[Dict[str, float]] = None
+    # Id of the stored profile when this run was profiled
+    profile_id: Optional[str] = None
+    # True when the deadline passed (or the client left) and only the pages
+    # finished until then are returned
+    partial: bool = False
 
 # Internal model for Pipeline processing (superset of API models)
 class Invoice(BaseModel):
@@ -61,4 +118,8 @@ class Invoice(BaseModel):
 
     @property
     def calculated_total(self) -> float:
-        return sum(item.item_amount for item in self.all_items)
+        return sum(item.item_amount for page in self.pages for item in page.bill_items)
+
+    @property
+    def total_item_count(self) -> int:
+        return sum(len(page.bill_items) for page in self.pages)
@@ -0,0 +1,126 @@
+import os
+import re
+from typing import List, Dict, Any, Optional
+from .models import Invoice, PageData
+from .logic import Validator
+
+# Separators stay on one line so a column header like "Amount" never picks up the next row
+AMOUNT = r'(?:rs\.?|₹)?[\t ]*(\d+(?:,\d{2,3})*(?:\.\d{1,2})?)'
+SUBTOTAL_PATTERNS = [
+    r'sub\s*-?\s*total[:\t ]+' + AMOUNT,
+    r'page\s+total[:\t ]+' + AMOUNT,
+]
+GRAND_TOTAL_PATTERNS = [
+    r'grand\s+total[:\t ]+' + AMOUNT,
+    r'net\s+(?:amount|payable)[:\t ]+' + AMOUNT,
+    r'total\s+(?:amount|payable)[:\t ]+' + AMOUNT,
+]
+TOTAL_PATTERNS = [
+    r'(?:grand\s+)?total[:\t ]+' + AMOUNT,
+    r'(?:net\s+)?amount[:\t ]+' + AMOUNT,
+]
+
+# Sums within this many currency units of the printed total count as matching
+TOLERANCE = 1.0
+# Upper bound on pages sent back through the LLM per document
+RECONCILE_MAX_PAGES = int(os.environ.get("RECONCILE_MAX_PAGES", "5"))
+
+
+def extract_amount(text: str, patterns: List[str]) -> Optional[float]:
+    """
+    First amount matched by any of the patterns (in order), or None.
+    """
+    text = text.lower()
+    for pattern in patterns:
+        match = re.search(pattern, text)
+        if match:
+            try:
+                return float(match.group(1).replace(',', ''))
+            except ValueError:
+                pass
+    return None
+
+
+class Reconciler:
+    """
+    Checks page-level and document-level totals against the extracted line
+    items and picks the pages worth re-extracting through the slow path.
+    """
+
+    def __init__(self, validator: Optional[Validator] = None, tolerance: float = TOLERANCE,
+                 max_pages: int = RECONCILE_MAX_PAGES):
+        self.validator = validator or Validator()
+        self.tolerance = tolerance
+        self.max_pages = max_pages
+
+    def check_page(self, page: PageData, text: str, single_page: bool = False) -> Dict[str, Any]:
+        """
+        Compare a page's item sum with the subtotal (or total) printed on it.
+        On multi-page documents a grand total is not a page total.
+        """
+        calculated = round(sum(item.item_amount for item in page.bill_items), 2)
+        printed = extract_amount(text, SUBTOTAL_PATTERNS)
+        if printed is None and (single_page or extract_amount(text, GRAND_TOTAL_PATTERNS) is None):
+            printed = extract_amount(text, TOTAL_PATTERNS)
+        if printed is None:
+            status = "no_total"
+        elif abs(calculated - printed) < self.tolerance:
+            status = "ok"
+        else:
+            status = "mismatch"
+        return {"page_no": page.page_no, "extracted_total": printed,
+                "calculated_total": calculated, "status": status}
+
+    def document_total(self, texts: List[str]) -> Optional[float]:
+        """
+        Grand total of the document: the last page carrying a grand/net
+        total, falling back to the last page with any total.
+        """
+        for patterns in (GRAND_TOTAL_PATTERNS, TOTAL_PATTERNS):
+            for text in reversed(texts):
+                amount = extract_amount(text, patterns)
+                if amount is not None:
+                    return amount
+        return None
+
+    def reconcile(self, invoice: Invoice, texts: List[str]) -> Dict[str, Any]:
+        """
+        Build the reconciliation report and set invoice.total_amount.
+        """
+        single_page = len(invoice.pages) == 1
+        pages = [self.check_page(page, text, single_page) for page, text in zip(invoice.pages, texts)]
+        total = self.document_total(texts)
+        invoice.total_amount = total or 0.0
+        return {
+            "document_total": total,
+            "calculated_total": round(invoice.calculated_total, 2),
+            "matched": self.validator.validate_math(invoice, tolerance=self.tolerance),
+            "pages": pages,
+        }
+
+    def pages_to_reextract(self, report: Dict[str, Any], slow_path_pages: List[int]) -> List[int]:
+        """
+        Indexes of pages to send through the slow path: pages whose own total
+        mismatches, and when only the document total is off, pages without a
+        printed total. Pages that already went through the LLM are skipped.
+        """
+        pages = report["pages"]
+        candidates = [i for i, page in enumerate(pages) if page["status"] == "mismatch"]
+        if not report["matched"] and report["document_total"] and not candidates:
+            candidates = [i for i, page in enumerate(pages) if page["status"] == "no_total"]
+        return [i for i in candidates if i not in slow_path_pages][:self.max_pages]
+
+    def improves(self, report: Dict[str, Any], index: int, old_sum: float, new_sum: float) -> bool:
+        """
+        Whether replacing a page's items (old_sum -> new_sum) brings the page,
+        or failing that the document, closer to its printed total.
+        """
+        page = report["pages"][index]
+        if page["extracted_total"] is not None:
+            target = page["extracted_total"]
+            return abs(new_sum - target) < abs(old_sum - target)
+        if report["document_total"]:
+            target = report["document_total"]
+            calculated = report["calculated_total"]
+            return abs(calculated - old_sum + new_sum - target) < abs(calculated - target)
+        return False
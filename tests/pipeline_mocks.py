@@ -0,0 +1,41 @@
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import numpy as np
+from src.pipeline import core
+from src.pipeline.checkpoints import CheckpointStore
+from src.pipeline.page_index import PageHashIndex
+
+
+def mocked_pipeline(page_count=1, image=None, triage=False, page_index=None, checkpoints=None):
+    """
+    ExtractionPipeline with download, rendering, preprocessing, OCR, the LLM
+    and the template store mocked. Triage, the page index and checkpoints
+    are off unless a test turns them on or passes its own, and nothing
+    touches the process-wide stores.
+    """
+    if page_index is None:
+        page_index = PageHashIndex(enabled=False)
+    if checkpoints is None:
+        checkpoints = CheckpointStore(enabled=False)
+    with patch.object(core, "get_template_store", return_value=MagicMock()), \
+            patch.object(core, "get_page_index", return_value=page_index):
+        pipeline = core.ExtractionPipeline()
+    pipeline.templates.match.return_value = None
+    pipeline.checkpoints = checkpoints
+    pipeline.triage.enabled = triage
+    pipeline.input_handler = MagicMock()
+    pipeline.preprocessor = MagicMock()
+    pipeline.ocr = MagicMock()
+    pipeline.llm = MagicMock()
+
+    pipeline.input_handler.download_file.return_value = "dummy.pdf"
+    pipeline.input_handler.count_pages.return_value = page_count
+    pipeline.input_handler.page_size.return_value = None
+    pipeline.input_handler.load_page.return_value = (
+        np.zeros((10, 10, 3), dtype=np.uint8) if image is None else image)
+    pipeline.preprocessor.preprocess.return_value = np.zeros((10, 100), dtype=np.uint8)
+    return pipeline
@@ -0,0 +1,105 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from src.pipeline.checkpoints import CheckpointStore
+from pipeline_mocks import mocked_pipeline
+
+WORDS = [{'text': 'Consultation', 'conf': 90.0, 'bbox': (0, 0, 50, 10)},
+         {'text': '150.00', 'conf': 90.0, 'bbox': (60, 0, 20, 10)}]
+
+
+class TestCheckpointStore(unittest.TestCase):
+    def test_save_resume_and_clear(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bill.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4 bill")
+            store = CheckpointStore(os.path.join(directory, "checkpoints"), enabled=True)
+
+            checkpoint = store.open(path)
+            checkpoint.save(1, "done", items=[], key=[7, ["10.00"]])
+            resumed = store.open(path)
+            self.assertEqual(resumed.get(1), {"status": "done", "items": [], "key": [7, ["10.00"]]})
+            self.assertIsNone(resumed.get(2))
+
+            resumed.clear()
+            self.assertEqual(store.open(path).pages, {})
+
+    def test_disabled_or_missing_file_is_a_no_op(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = CheckpointStore(directory, enabled=True)
+            checkpoint = store.open(os.path.join(directory, "missing.pdf"))
+            checkpoint.save(1, "done")
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_expired_documents_are_pruned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = CheckpointStore(directory, ttl=60, enabled=True)
+            store._save("old", 1, {"status": "done"})
+            old = time.time() - 120
+            os.utime(os.path.join(directory, "old"), (old, old))
+            store._save("new", 1, {"status": "done"})
+            self.assertEqual(os.listdir(directory), ["new"])
+
+
+class TestPipelineResume(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = CheckpointStore(os.path.join(self.directory.name, "checkpoints"), enabled=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_pipeline(self, page_count, ocr_results):
+        pipeline = mocked_pipeline(page_count=page_count, checkpoints=self.store)
+
+        def download(url, deadline=None):
+            # The pipeline deletes its download, so every attempt gets a fresh copy
+            path = os.path.join(self.directory.name, "bill.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4 same bill")
+            return path
+        pipeline.input_handler.download_file.side_effect = download
+        pipeline.ocr.extract_data.side_effect = ocr_results
+        pipeline.ocr.extract_text.return_value = "Consultation 150.00"
+        return pipeline
+
+    def test_retry_resumes_from_first_incomplete_page(self):
+        pipeline = self.make_pipeline(3, [WORDS, WORDS, RuntimeError("worker died")])
+        result = pipeline.process_url("http://example.com/bill.pdf")
+        self.assertIn("error", result)
+
+        pipeline = self.make_pipeline(3, [WORDS])
+        result = pipeline.process_url("http://example.com/bill.pdf?retry=1")
+
+        self.assertEqual([p.page_no for p in result["invoice"].pages], ["1", "2", "3"])
+        self.assertEqual(result["invoice"].pages[0].bill_items[0].item_amount, 150.0)
+        self.assertEqual(pipeline.ocr.extract_data.call_count, 1)
+        pipeline.input_handler.load_page.assert_called_once()
+        # A completed document leaves no checkpoints behind
+        self.assertEqual(os.listdir(self.store.directory), [])
+
+    def test_cut_off_llm_page_resumes_from_ocr(self):
+        pipeline = self.make_pipeline(2, [[], RuntimeError("worker died")])
+        pipeline.llm.stream_table.return_value = iter([])
+        pipeline.llm.last_stream_complete = False
+        pipeline.process_url("http://example.com/bill.pdf")
+
+        pipeline = self.make_pipeline(2, [WORDS])
+        pipeline.llm.stream_table.return_value = iter([
+            {"item_name": "Room Rent", "item_rate": 900.0, "item_quantity": 1.0, "item_amount": 900.0}])
+        pipeline.llm.last_stream_complete = True
+        result = pipeline.process_url("http://example.com/bill.pdf")
+
+        # Page 1 skips OCR but asks the LLM again; page 2 is processed normally
+        self.assertEqual(pipeline.ocr.extract_data.call_count, 1)
+        self.assertEqual(result["invoice"].pages[0].bill_items[0].item_name, "Room Rent")
+
+
+if __name__ == '__main__':
+    unittest.main()
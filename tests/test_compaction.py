@@ -0,0 +1,60 @@
+import unittest
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.llm.compaction import compact_page, estimate_tokens, MIN_MAX_TOKENS, MAX_MAX_TOKENS
+
+
+def line(*words, y=0):
+    return [{'text': text, 'conf': 90.0, 'bbox': (x, y, 8 * len(text), 20)} for text, x in words]
+
+
+class TestCompaction(unittest.TestCase):
+    def test_drops_letterhead_and_footer(self):
+        lines = [
+            line(("City", 50), ("Hospital", 100), ("Phone", 300), ("9876543210", 360)),
+            line(("Patient:", 50), ("John", 130), ("Doe", 180)),
+            line(("Bill", 50), ("No", 90), ("1234", 120), ("Date", 300), ("12/03/2024", 350)),
+            line(("Description", 50), ("Qty", 500), ("Amount", 800)),
+            line(("Consultation", 50), ("1", 500), ("150.00", 800)),
+            line(("Dressing", 50), ("2", 500), ("80.00", 800)),
+            line(("This", 50), ("is", 90), ("a", 110), ("computer", 130), ("generated", 200), ("bill", 280)),
+        ]
+        raw_text = "\n".join(" ".join(w['text'] for w in l) for l in lines)
+
+        compacted = compact_page(lines, raw_text)
+
+        self.assertTrue(compacted.text.startswith("Description"))
+        self.assertIn("Consultation | 1 | 150.00", compacted.text)
+        self.assertNotIn("Patient", compacted.text)
+        self.assertNotIn("generated", compacted.text)
+        self.assertEqual(compacted.expected_rows, 2)
+        self.assertLess(compacted.tokens_after, compacted.tokens_before)
+        self.assertEqual(compacted.max_tokens, MIN_MAX_TOKENS)
+
+    def test_falls_back_to_normalized_text(self):
+        compacted = compact_page([], "Item 1    10.00\n\n   Item 2 20.00  ")
+        self.assertEqual(compacted.text, "Item 1 10.00\nItem 2 20.00")
+        self.assertEqual(compacted.tokens_before, estimate_tokens("Item 1    10.00\n\n   Item 2 20.00  "))
+
+    def test_budget_fits_long_item_names(self):
+        names = [f"Inj. Piperacillin 4 g + Tazobactam 500 mg (Piptaz 4.5 g Vial) Mfr Alkem Batch PT22{i:02d}"
+                 for i in range(30)]
+        lines = [line(("Description", 50), ("Qty", 700), ("Rate", 800), ("Amount", 900), y=0)]
+        lines += [line((name, 50), ("2", 700), ("512.50", 800), ("1025.00", 900), y=30 * (i + 1))
+                  for i, name in enumerate(names)]
+        raw_text = "\n".join(" ".join(w['text'] for w in l) for l in lines)
+
+        compacted = compact_page(lines, raw_text)
+
+        # What the model writes back, at ~3 characters per token for JSON
+        output = json.dumps([{"item_name": name, "item_rate": 512.5, "item_quantity": 2,
+                              "item_amount": 1025.0} for name in names])
+        self.assertGreaterEqual(compacted.max_tokens, len(output) / 3)
+        self.assertLessEqual(compacted.max_tokens, MAX_MAX_TOKENS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from pydantic import ValidationError
+from src.utils.deadline import Deadline, RequestCancelled
+from src.utils.metrics import StageTimer, ERRORS
+from src.llm.client import LLMClient
+from src.utils.input_handler import InputHandler, DOWNLOAD_TIMEOUT
+from pipeline_mocks import mocked_pipeline
+
+
+def chunk(text):
+    return MagicMock(choices=[MagicMock(delta=MagicMock(content=text))], usage=None, x_groq=None)
+
+
+class TestDeadline(unittest.TestCase):
+    def test_expires(self):
+        deadline = Deadline(0.01)
+        self.assertFalse(deadline.cancelled)
+        time.sleep(0.02)
+        with self.assertRaises(RequestCancelled) as ctx:
+            deadline.check()
+        self.assertEqual(ctx.exception.reason, "deadline")
+        self.assertEqual(deadline.remaining(), 0.0)
+
+    def test_cancel_and_no_timeout(self):
+        deadline = Deadline(0)
+        self.assertIsNone(deadline.remaining())
+        deadline.check()
+        deadline.cancel("disconnect")
+        with self.assertRaises(RequestCancelled):
+            deadline.check()
+        self.assertEqual(deadline.reason, "disconnect")
+
+    def test_client_timeout_is_capped(self):
+        with patch("src.utils.deadline.REQUEST_TIMEOUT", 60.0):
+            self.assertLessEqual(Deadline.for_request(1e9).remaining(), 60.0)
+            self.assertLessEqual(Deadline.for_request(5).remaining(), 5.0)
+            self.assertGreater(Deadline.for_request(None).remaining(), 59.0)
+
+    def test_client_timeout_must_be_positive(self):
+        from src.api import BillRequest
+        for timeout in (0, -1):
+            with self.assertRaises(ValidationError):
+                BillRequest(document="http://example.com/bill.pdf", timeout_seconds=timeout)
+        self.assertEqual(BillRequest(document="http://example.com/bill.pdf", timeout_seconds=30).timeout_seconds, 30)
+
+    def test_cancellation_is_not_a_stage_error(self):
+        timer = StageTimer()
+        before = ERRORS.value(stage="llm")
+        with self.assertRaises(RequestCancelled):
+            with timer.stage("llm"):
+                raise RequestCancelled("deadline")
+        self.assertEqual(ERRORS.value(stage="llm"), before)
+        with self.assertRaises(ValueError):
+            with timer.stage("llm"):
+                raise ValueError("bad response")
+        self.assertEqual(ERRORS.value(stage="llm"), before + 1)
+
+
+class TestLLMCancellation(unittest.TestCase):
+    def test_stream_is_closed_on_cancel(self):
+        deadline = Deadline(0)
+        stream = MagicMock()
+        chunks = [chunk('[{"item_name": "A", "item_amount": 5}'), chunk(', {"item_name": "B", "item_amount": 6}]')]
+
+        def produce():
+            yield chunks[0]
+            deadline.cancel("disconnect")
+            yield chunks[1]
+        stream.__iter__.side_effect = produce
+
+        llm = LLMClient()
+        llm.client = MagicMock()
+        llm.client.chat.completions.create.return_value = stream
+
+        items = []
+        with self.assertRaises(RequestCancelled):
+            for item in llm.stream_table("text", deadline=deadline):
+                items.append(item)
+        self.assertEqual([item["item_name"] for item in items], ["A"])
+        stream.close.assert_called_once()
+
+
+class TestDownloadDeadline(unittest.TestCase):
+    def test_timeout_is_capped_by_deadline(self):
+        deadline = Deadline(2)
+        response = MagicMock()
+        response.iter_content.return_value = [b"%PDF"]
+        with patch("src.utils.input_handler.requests.get", return_value=response) as get:
+            path = InputHandler().download_file("http://example.com/bill.pdf", deadline)
+        os.remove(path)
+        self.assertLessEqual(get.call_args.kwargs["timeout"], 2)
+        self.assertLess(2, DOWNLOAD_TIMEOUT)
+
+    def test_cancel_stops_between_chunks(self):
+        deadline = Deadline(0)
+
+        def chunks(chunk_size):
+            yield b"%PDF-1.4"
+            deadline.cancel("disconnect")
+            yield b"never written"
+        response = MagicMock()
+        response.iter_content.side_effect = chunks
+        with tempfile.TemporaryDirectory() as tmp, patch("tempfile.tempdir", tmp), \
+                patch("src.utils.input_handler.requests.get", return_value=response):
+            with self.assertRaises(RequestCancelled):
+                InputHandler().download_file("http://example.com/bill.pdf", deadline)
+            # The partial download is removed
+            self.assertEqual(os.listdir(tmp), [])
+
+
+class TestPipelineDeadline(unittest.TestCase):
+    def make_pipeline(self, deadline):
+        pipeline = mocked_pipeline(page_count=3)
+
+        def extract_data(image):
+            # The client goes away while the second page is being OCRed
+            if pipeline.ocr.extract_data.call_count == 2:
+                deadline.cancel("disconnect")
+            return [{'text': 'Consultation', 'conf': 90.0, 'bbox': (0, 0, 50, 10)},
+                    {'text': '150.00', 'conf': 90.0, 'bbox': (60, 0, 20, 10)}]
+        pipeline.ocr.extract_data.side_effect = extract_data
+        pipeline.ocr.extract_text.return_value = "Consultation 150.00"
+        return pipeline
+
+    def test_partial_result_keeps_finished_pages(self):
+        deadline = Deadline(0)
+        pipeline = self.make_pipeline(deadline)
+
+        result = pipeline.process_url("http://example.com/bill.pdf", deadline=deadline, allow_partial=True)
+
+        self.assertTrue(result["partial"])
+        self.assertEqual(result["cancelled"], "disconnect")
+        self.assertEqual(result["pages_total"], 3)
+        self.assertEqual([p.page_no for p in result["invoice"].pages], ["1", "2"])
+        self.assertEqual(pipeline.ocr.extract_data.call_count, 2)
+
+    def test_cancel_without_partial_is_an_error(self):
+        deadline = Deadline(0)
+        pipeline = self.make_pipeline(deadline)
+
+        result = pipeline.process_url("http://example.com/bill.pdf", deadline=deadline)
+
+        self.assertIn("error", result)
+        self.assertEqual(result["cancelled"], "disconnect")
+        self.assertEqual(pipeline.ocr.extract_data.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
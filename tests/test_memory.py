@@ -0,0 +1,121 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import cv2
+import numpy as np
+from fastapi.testclient import TestClient
+from src import api
+from src.utils.memory import MemoryGovernor, MemoryBudgetExceeded, MAX_PAGE_MEGAPIXELS, MEMORY_RETRY_AFTER
+from src.utils.image_processing import ImagePreprocessor
+from src.utils.input_handler import InputHandler
+from pipeline_mocks import mocked_pipeline
+
+
+class TestMemoryGovernor(unittest.TestCase):
+    def test_rejects_page_larger_than_budget(self):
+        governor = MemoryGovernor(budget_pixels=100)
+        with self.assertRaises(MemoryBudgetExceeded):
+            governor.acquire(101)
+
+    def test_queues_until_budget_is_released(self):
+        governor = MemoryGovernor(budget_pixels=100, queue_timeout=5)
+        governor.acquire(80)
+        acquired = threading.Event()
+
+        def second_page():
+            with governor.reserve(50):
+                acquired.set()
+
+        thread = threading.Thread(target=second_page)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+        self.assertEqual(governor.usage()["pages_waiting"], 1)
+
+        governor.release(80)
+        thread.join(timeout=2)
+        self.assertTrue(acquired.is_set())
+        self.assertEqual(governor.in_flight, 0)
+
+    def test_times_out_when_budget_stays_full(self):
+        governor = MemoryGovernor(budget_pixels=100, queue_timeout=0.05)
+        governor.acquire(80)
+        with self.assertRaises(MemoryBudgetExceeded):
+            governor.acquire(50)
+        self.assertEqual(governor.waiting, 0)
+
+
+class TestDownsample(unittest.TestCase):
+    def test_downsample_caps_megapixels(self):
+        image = np.zeros((2000, 1000, 3), dtype=np.uint8)
+        small = ImagePreprocessor().downsample(image, max_megapixels=0.5)
+        self.assertLessEqual(small.shape[0] * small.shape[1], 500000)
+        self.assertAlmostEqual(small.shape[0] / small.shape[1], 2.0, places=1)
+        self.assertIs(ImagePreprocessor().downsample(image, max_megapixels=5), image)
+
+
+class TestRenderBudget(unittest.TestCase):
+    def test_budget_is_reserved_before_rendering(self):
+        pipeline = mocked_pipeline()
+        pipeline.memory = MemoryGovernor(budget_pixels=int(100e6))
+        pipeline.input_handler.page_size.return_value = (6000, 8000)  # 48 MP
+        pipeline.ocr.extract_data.return_value = []
+        pipeline.ocr.extract_text.return_value = ""
+        renders = []
+
+        def load_page(path, n, scale=1.0):
+            renders.append((pipeline.memory.in_flight, scale))
+            return np.zeros((10, 10, 3), dtype=np.uint8)
+        pipeline.input_handler.load_page.side_effect = load_page
+
+        pipeline.process_url("http://example.com/scan.pdf")
+        # Reserved at the capped size, and rendered at half scale (48 MP -> 12 MP)
+        self.assertEqual(renders, [(int(MAX_PAGE_MEGAPIXELS * 1e6), 0.5)])
+        self.assertEqual(pipeline.memory.in_flight, 0)
+
+    def test_rejected_page_asks_client_to_retry(self):
+        pipeline = mocked_pipeline()
+        pipeline.memory = MemoryGovernor(budget_pixels=int(1e6), queue_timeout=0.05)
+        pipeline.input_handler.page_size.return_value = (2000, 3000)
+
+        result = pipeline.process_url("http://example.com/scan.pdf")
+
+        self.assertEqual(result["retry_after"], MEMORY_RETRY_AFTER)
+        pipeline.input_handler.load_page.assert_not_called()
+
+    def test_rejection_is_503_with_retry_after(self):
+        pipeline = MagicMock()
+        pipeline.process_url.return_value = {"error": "Page needs 6000000 pixels", "retry_after": 7}
+        with patch.object(api, "ExtractionPipeline", return_value=pipeline):
+            response = TestClient(api.app).post("/extract-bill-data",
+                                                json={"document": "http://example.com/scan.pdf"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "7")
+        self.assertFalse(response.json()["is_success"])
+
+    def test_page_size_from_pdf_page_box(self):
+        info = {"Pages": 3, "Page    2 size": "612 x 792 pts (letter)", "Page    2 rot": "0"}
+        with patch("pdf2image.pdfinfo_from_path", return_value=info) as pdfinfo:
+            self.assertEqual(InputHandler().page_size("bill.pdf", 2), (1700, 2200))
+        self.assertEqual(pdfinfo.call_args.kwargs, {"first_page": 2, "last_page": 2})
+
+    def test_image_page_rendered_at_scale(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bill.png")
+            cv2.imwrite(path, np.zeros((400, 300, 3), dtype=np.uint8))
+            handler = InputHandler()
+            self.assertEqual(handler.page_size(path, 1), (300, 400))
+            self.assertEqual(handler.load_page(path, 1, scale=0.3).shape, (120, 90, 3))
+            self.assertEqual(handler.load_page(path, 1).shape, (400, 300, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.metrics import MetricsRegistry, StageTimer, STAGE_SECONDS, ERRORS, count_error
+
+
+class TestMetrics(unittest.TestCase):
+    def test_render_counter_and_histogram(self):
+        registry = MetricsRegistry()
+        pages = registry.counter("pages_total", "Pages", ["path"])
+        latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+        pages.inc(path="fast")
+        pages.inc(2, path="llm")
+        latency.observe(0.5)
+
+        output = registry.render()
+        self.assertIn("# TYPE pages_total counter", output)
+        self.assertIn('pages_total{path="llm"} 2.0', output)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0', output)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 1', output)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1', output)
+        self.assertIn("latency_seconds_count 1", output)
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        errors = registry.counter("errors_total", "Errors", ["stage"])
+        errors.inc(stage='a"b\\c\nd')
+        self.assertIn('errors_total{stage="a\\"b\\\\c\\nd"} 1.0', registry.render())
+
+    def test_label_mismatch_raises(self):
+        registry = MetricsRegistry()
+        pages = registry.counter("pages_total", "Pages", ["path"])
+        with self.assertRaises(ValueError):
+            pages.inc(stage="ocr")
+
+    def test_stage_timer_accumulates_and_counts_errors(self):
+        timer = StageTimer()
+        before = STAGE_SECONDS.count(stage="unit_test")
+        errors_before = ERRORS.value(stage="unit_test")
+
+        with timer.stage("unit_test"):
+            pass
+        with self.assertRaises(RuntimeError):
+            with timer.stage("unit_test"):
+                raise RuntimeError("boom")
+
+        self.assertIn("unit_test", timer.timings)
+        self.assertEqual(STAGE_SECONDS.count(stage="unit_test"), before + 2)
+        self.assertEqual(ERRORS.value(stage="unit_test"), errors_before + 1)
+
+    def test_error_is_counted_once(self):
+        timer = StageTimer()
+        inner_before = ERRORS.value(stage="unit_inner")
+        outer_before = ERRORS.value(stage="unit_outer")
+        pipeline_before = ERRORS.value(stage="pipeline")
+
+        try:
+            with timer.stage("unit_outer"):
+                with timer.stage("unit_inner"):
+                    raise RuntimeError("boom")
+        except RuntimeError as e:
+            count_error(e, "pipeline")
+
+        self.assertEqual(ERRORS.value(stage="unit_inner"), inner_before + 1)
+        self.assertEqual(ERRORS.value(stage="unit_outer"), outer_before)
+        self.assertEqual(ERRORS.value(stage="pipeline"), pipeline_before)
+
+
+if __name__ == '__main__':
+    unittest.main()
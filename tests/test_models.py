@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import patch
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.validation.models import Invoice, LineItem, PageData
+
+
+def item(name, amount):
+    return {'item_name': name, 'item_rate': amount, 'item_quantity': 1, 'item_amount': amount}
+
+
+class TestModels(unittest.TestCase):
+    def test_from_clean_matches_validated_item(self):
+        self.assertEqual(LineItem.from_clean(item("Dressing", 80)), LineItem(**item("Dressing", 80)))
+        # Dirty values still go through the converters
+        dirty = LineItem.from_clean({'item_name': "X-Ray", 'item_rate': "1,200", 'item_quantity': None,
+                                     'item_amount': "₹1,200"})
+        self.assertEqual(dirty.item_amount, 1200.0)
+        self.assertEqual(dirty.item_quantity, 0.0)
+
+    def test_bulk_skips_invalid_rows(self):
+        items = LineItem.bulk_from_clean([item("A", 1), {'item_name': "B"}, item("C", 3)])
+        self.assertEqual([i.item_name for i in items], ["A", "C"])
+        self.assertIsInstance(items[1].item_amount, float)
+
+    def test_invoice_aggregates_follow_page_changes(self):
+        invoice = Invoice(pages=[PageData(page_no="1", bill_items=LineItem.bulk_from_clean([item("A", 10)]))])
+        self.assertEqual(invoice.total_item_count, 1)
+        self.assertEqual(invoice.calculated_total, 10.0)
+
+        invoice.pages[0].bill_items.append(LineItem(**item("B", 5)))
+        self.assertEqual(invoice.calculated_total, 15.0)
+
+        invoice.pages.append(PageData(page_no="2", bill_items=[LineItem(**item("C", 1))]))
+        self.assertEqual(invoice.total_item_count, 3)
+
+        invoice.pages[1].bill_items = []
+        self.assertEqual([i.item_name for i in invoice.all_items], ["A", "B"])
+
+    def test_invoice_total_follows_same_length_changes(self):
+        invoice = Invoice(pages=[PageData(page_no="1", bill_items=[LineItem(**item("A", 10))])])
+        self.assertEqual(invoice.calculated_total, 10.0)
+
+        invoice.pages[0].bill_items[0] = LineItem(**item("A", 99))
+        self.assertEqual(invoice.calculated_total, 99.0)
+
+        invoice.pages[0].bill_items[0].item_amount = 5.0
+        self.assertEqual(invoice.calculated_total, 5.0)
+
+    def test_heuristic_parser_builds_a_page_in_one_batch(self):
+        os.environ.setdefault("GROQ_API_KEY", "test")
+        from src.pipeline.core import ExtractionPipeline
+        lines = [[{'text': name, 'bbox': (0, y, 50, 10)}, {'text': amount, 'bbox': (60, y, 20, 10)}]
+                 for y, (name, amount) in enumerate([("Consultation", "150.00"), ("Dressing", "80.00")])]
+        with patch.object(LineItem, "bulk_from_clean", wraps=LineItem.bulk_from_clean) as bulk:
+            items = ExtractionPipeline()._parse_lines_to_items(lines)
+        bulk.assert_called_once()
+        self.assertEqual([(i.item_name, i.item_amount) for i in items], [("Consultation", 150.0), ("Dressing", 80.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import cv2
+import numpy as np
+from src.pipeline.page_index import (PageHashIndex, CachedPage, perceptual_hash, hamming_distance,
+                                     same_page, same_text)
+from src.validation.models import LineItem
+from pipeline_mocks import mocked_pipeline
+
+
+def page(title, rows):
+    image = np.full((1100, 850, 3), 255, dtype=np.uint8)
+    lines = [title, "Description Qty Rate Amount"] + rows
+    for i, text in enumerate(lines):
+        cv2.putText(image, text, (40, 80 + i * 45), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 0), 2)
+    return image
+
+
+HOSPITAL = page("CITY HOSPITAL", [f"Item {i} 1 {i * 10}.00 {i * 10}.00" for i in range(1, 15)])
+PHARMACY = page("PHARMACY", [f"Drug {i} 2 {i * 7}.50 {i * 15}.00" for i in range(1, 6)])
+TEXT = "Consultation 1 150.00"
+
+
+def rescan(image):
+    noise = np.random.default_rng(0).normal(0, 12, image.shape)
+    return cv2.resize(np.clip(image + noise, 0, 255).astype(np.uint8), (800, 1035))
+
+
+class TestPerceptualHash(unittest.TestCase):
+    def test_rescan_matches_and_other_page_does_not(self):
+        original = perceptual_hash(HOSPITAL)
+        self.assertLessEqual(hamming_distance(original, perceptual_hash(rescan(HOSPITAL))), 6)
+        self.assertGreater(hamming_distance(original, perceptual_hash(PHARMACY)), 6)
+
+    def test_signature_separates_lookalike_pages(self):
+        self.assertTrue(same_page(1, ("10.00",), 1, ("10.00",)))
+        self.assertFalse(same_page(1, ("10.00",), 1, ("18.00",)))
+        self.assertTrue(same_page(1, None, 3, ("18.00",)))
+
+    def test_same_text_needs_the_same_numbers(self):
+        text = "CITY HOSPITAL\nRoom Rent 2 1500 3000\nConsultation 1 500 500"
+        self.assertTrue(same_text(text, text.replace("Consultation", "Consultaticn")))
+        self.assertFalse(same_text(text, text.replace("3000", "4500")))
+        self.assertFalse(same_text("", ""))
+
+    def test_index_is_bounded_lru(self):
+        index = PageHashIndex(max_entries=2)
+        block = 0xFFFF  # 16 bits apart from each other
+        for phash in (0, block << 20, block << 40):
+            index.add(CachedPage(phash, None, TEXT, 100, [], [], "Bill Detail"))
+        self.assertEqual(len(index), 2)
+        self.assertIsNone(index.lookup(0, None, TEXT))
+        self.assertIsNotNone(index.lookup((block << 40) | 1, None, TEXT))
+        # A close hash alone is never a match
+        self.assertIsNone(index.lookup(block << 40, None, "Consultation 1 900.00"))
+
+    def test_update_reaches_entry_matched_on_close_hash_and_text(self):
+        index = PageHashIndex()
+        text = "CITY HOSPITAL\nRoom Rent 2 1500 3000\nConsultation 1 500 500"
+        index.add(CachedPage(0, None, text, 100, [], [], "Bill Detail"))
+        rescanned = text.replace("Consultation", "Consultaticn")
+        index.update_items(1, None, rescanned, [LineItem(item_name="Room Rent", item_amount=3000.0, item_rate=1500.0, item_quantity=2.0)])
+        entry = index.lookup(0, None, text)
+        self.assertEqual([item.item_amount for item in entry.items], [3000.0])
+        self.assertTrue(entry.slow_path)
+
+
+def ocr(*rows):
+    """
+    OCR words and text for rows of (name, amount).
+    """
+    words = []
+    for i, (name, amount) in enumerate(rows):
+        words += [{'text': name, 'conf': 90.0, 'bbox': (0, i * 20, 50, 10)},
+                  {'text': amount, 'conf': 90.0, 'bbox': (60, i * 20, 20, 10)}]
+    return words, "\n".join(f"{name} {amount}" for name, amount in rows)
+
+
+class TestPipelineDuplicates(unittest.TestCase):
+    def make_pipeline(self, images, index, pages):
+        pipeline = mocked_pipeline(page_count=len(images), page_index=index)
+        pipeline.input_handler.load_page.side_effect = lambda path, n, scale=1.0: images[n - 1]
+        pipeline.ocr.extract_data.side_effect = [words for words, _ in pages]
+        pipeline.ocr.extract_text.side_effect = [text for _, text in pages]
+        return pipeline
+
+    def amounts(self, result):
+        return [[item.item_amount for item in p.bill_items] for p in result["invoice"].pages]
+
+    def test_duplicates_within_and_across_documents(self):
+        index = PageHashIndex(max_entries=8)
+        hospital = ocr(("Consultation", "150.00"), ("Dressing", "80.00"))
+        pharmacy = ocr(("Paracetamol", "35.00"))
+
+        pipeline = self.make_pipeline([HOSPITAL, PHARMACY, rescan(HOSPITAL)], index,
+                                      [hospital, pharmacy, hospital])
+        result = pipeline.process_url("http://example.com/bundle.pdf")
+        # The office copy of page 1 is OCRed to confirm it, but not added again
+        self.assertEqual([p.page_no for p in result["invoice"].pages], ["1", "2"])
+        self.assertEqual(pipeline.templates.match.call_count, 2)
+
+        pipeline = self.make_pipeline([rescan(PHARMACY)], index, [pharmacy])
+        result = pipeline.process_url("http://example.com/reupload.pdf")
+        self.assertEqual(self.amounts(result), [[35.0]])
+        pipeline.templates.match.assert_not_called()
+
+    def test_cache_hit_keeps_the_pages_own_text(self):
+        index = PageHashIndex(max_entries=8)
+        rows = [("Paracetamol", "35.00"), ("Pantoprazole", "120.00"), ("Ondansetron", "48.00"),
+                ("Cetirizine", "22.00"), ("Amoxicillin", "96.00")]
+        pipeline = self.make_pipeline([PHARMACY], index, [ocr(*rows)])
+        pipeline.process_url("http://example.com/bill.pdf")
+
+        # A re-scan reads slightly differently; its own text is what gets reconciled
+        rescanned = ocr(("Paracetamcl", "35.00"), *rows[1:])
+        pipeline = self.make_pipeline([rescan(PHARMACY)], index, [rescanned])
+        with patch.object(pipeline.reconciler, "reconcile", wraps=pipeline.reconciler.reconcile) as reconcile:
+            result = pipeline.process_url("http://example.com/reupload.pdf")
+        pipeline.templates.match.assert_not_called()
+        self.assertEqual(self.amounts(result), [[35.0, 120.0, 48.0, 22.0, 96.0]])
+        self.assertEqual(reconcile.call_args.args[1], [rescanned[1]])
+
+    def test_same_layout_pages_with_different_rows(self):
+        index = PageHashIndex(max_entries=8)
+        first = ocr(("Room Rent", "1500.00"), ("Consultation", "500.00"))
+        second = ocr(("Room Rent", "1800.00"), ("Consultation", "700.00"))
+
+        # Same layout, so the page hashes match; the rows do not
+        pipeline = self.make_pipeline([HOSPITAL, HOSPITAL], index, [first, second])
+        result = pipeline.process_url("http://example.com/patient_a.pdf")
+        self.assertEqual(self.amounts(result), [[1500.0, 500.0], [1800.0, 700.0]])
+
+        # Another patient's page of the same layout is not served from the index
+        third = ocr(("Room Rent", "900.00"), ("Consultation", "500.00"))
+        pipeline = self.make_pipeline([HOSPITAL], index, [third])
+        result = pipeline.process_url("http://example.com/patient_b.pdf")
+        self.assertEqual(self.amounts(result), [[900.0, 500.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.utils.metrics import StageTimer
+from src.utils.profiling import RequestProfiler, ProfileStore
+import src.utils.profiling as profiling
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = patch.object(profiling, "PROFILE_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_span_tree_nests_stages(self):
+        timer = StageTimer()
+        with timer.span("page", page=1):
+            with timer.stage("ocr"):
+                pass
+        self.assertEqual(timer.spans[0]["name"], "page")
+        self.assertEqual(timer.spans[0]["attrs"], {"page": 1})
+        self.assertEqual(timer.spans[0]["children"][0]["name"], "ocr")
+
+    def test_requested_profile_is_stored(self):
+        profiler = RequestProfiler(requested=True, slow_threshold=0)
+        profiler.start()
+        sum(range(1000))
+        profile_id = profiler.stop([], url="http://example.com/bill.pdf")
+
+        stored = ProfileStore().load(profile_id)
+        self.assertEqual(stored["trigger"], "requested")
+        self.assertEqual(stored["mode"], "cprofile")
+        self.assertEqual(stored["url"], "http://example.com/bill.pdf")
+
+    def test_fast_run_is_not_stored(self):
+        profiler = RequestProfiler(requested=False, slow_threshold=60)
+        profiler.start()
+        self.assertIsNone(profiler.stop([]))
+        self.assertEqual(ProfileStore().list(), [])
+
+    def test_slow_run_is_sampled(self):
+        profiler = RequestProfiler(requested=False, slow_threshold=0.05)
+        profiler.start()
+        time.sleep(0.1)
+        profile_id = profiler.stop([])
+
+        stored = ProfileStore().load(profile_id)
+        self.assertEqual(stored["trigger"], "slow")
+        self.assertEqual(stored["mode"], "sampling")
+        self.assertGreater(stored["stats"]["total_samples"], 0)
+
+    def test_load_rejects_path_traversal(self):
+        self.assertIsNone(ProfileStore().load("../etc/passwd"))
+
+    def test_store_prunes_oldest(self):
+        store = ProfileStore(self.tmp.name, max_files=2)
+        for i in range(3):
+            store.save({"profile_id": f"p{i}", "created_at": i})
+            os.utime(os.path.join(self.tmp.name, f"p{i}.json"), (i, i))
+        self.assertEqual(sorted(p["profile_id"] for p in store.list()), ["p1", "p2"])
+
+
+class TestAdminAccess(unittest.TestCase):
+    def setUp(self):
+        os.environ.setdefault("GROQ_API_KEY", "test")
+        from fastapi.testclient import TestClient
+        from src import api
+        self.client = TestClient(api.app)
+
+    def test_admin_is_closed_without_token_configured(self):
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("ADMIN_TOKEN", None)
+            self.assertEqual(self.client.get("/admin/profiles").status_code, 403)
+
+    def test_admin_requires_matching_token(self):
+        with patch.dict(os.environ, {"ADMIN_TOKEN": "secret"}), \
+                patch.object(profiling, "PROFILE_DIR", tempfile.mkdtemp()):
+            self.assertEqual(self.client.get("/admin/profiles").status_code, 403)
+            self.assertEqual(self.client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code, 403)
+            self.assertEqual(self.client.get("/admin/profiles", headers={"X-Admin-Token": "secret"}).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
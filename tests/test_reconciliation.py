@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from src.validation.models import Invoice, LineItem, PageData
+from src.validation.reconciliation import Reconciler, extract_amount, TOTAL_PATTERNS
+from pipeline_mocks import mocked_pipeline
+
+
+def page(no, *amounts):
+    return PageData(page_no=str(no), bill_items=[
+        LineItem(item_name=f"Item {no}-{i}", item_rate=a, item_quantity=1, item_amount=a)
+        for i, a in enumerate(amounts)])
+
+
+class TestReconciler(unittest.TestCase):
+    def test_total_stays_on_one_line(self):
+        self.assertEqual(extract_amount("Grand Total: Rs. 1,23,456.50", TOTAL_PATTERNS), 123456.5)
+        self.assertIsNone(extract_amount("Qty Rate Amount\n1 Consultation 150.00", TOTAL_PATTERNS))
+
+    def test_page_and_document_checks(self):
+        invoice = Invoice(pages=[page(1, 100, 50), page(2, 30)])
+        texts = ["Sub Total: 150.00", "Sub Total: 80.00\nGrand Total: 230.00"]
+
+        report = Reconciler().reconcile(invoice, texts)
+
+        self.assertEqual([p["status"] for p in report["pages"]], ["ok", "mismatch"])
+        self.assertEqual(report["document_total"], 230.0)
+        self.assertEqual(invoice.total_amount, 230.0)
+        self.assertFalse(report["matched"])
+        self.assertEqual(Reconciler().pages_to_reextract(report, slow_path_pages=[]), [1])
+        self.assertEqual(Reconciler().pages_to_reextract(report, slow_path_pages=[1]), [])
+
+    def test_grand_total_is_not_a_page_total_on_multi_page_bills(self):
+        invoice = Invoice(pages=[page(1, 100), page(2, 50)])
+        report = Reconciler().reconcile(invoice, ["", "Grand Total: 150.00"])
+        self.assertEqual(report["pages"][1]["status"], "no_total")
+        self.assertTrue(report["matched"])
+
+    def test_document_mismatch_targets_pages_without_totals(self):
+        invoice = Invoice(pages=[page(1, 100), page(2, 40)])
+        report = Reconciler().reconcile(invoice, ["Sub Total: 100.00", "Grand Total: 150.00"])
+        self.assertEqual(Reconciler().pages_to_reextract(report, slow_path_pages=[]), [1])
+
+
+class TestPipelineReconciliation(unittest.TestCase):
+    def test_only_mismatching_page_is_reextracted(self):
+        pipeline = mocked_pipeline(page_count=2)
+        pipeline.ocr.extract_data.side_effect = [
+            [{'text': 'Consultation', 'conf': 90.0, 'bbox': (0, 0, 50, 10)},
+             {'text': '150.00', 'conf': 90.0, 'bbox': (60, 0, 20, 10)}],
+            [{'text': 'Dressing', 'conf': 90.0, 'bbox': (0, 0, 50, 10)},
+             {'text': '8.00', 'conf': 90.0, 'bbox': (60, 0, 20, 10)}],
+        ]
+        pipeline.ocr.extract_text.side_effect = [
+            "Consultation 150.00\nSub Total: 150.00",
+            "Dressing 8.00\nSub Total: 80.00\nGrand Total: 230.00",
+        ]
+        pipeline.llm.stream_table.return_value = iter([
+            {"item_name": "Dressing", "item_rate": 80.0, "item_quantity": 1.0, "item_amount": 80.0}])
+
+        result = pipeline.process_url("http://example.com/bill.pdf")
+
+        self.assertEqual(pipeline.llm.stream_table.call_count, 1)
+        report = result["reconciliation"]
+        self.assertEqual(report["reextracted_pages"], ["2"])
+        self.assertTrue(report["matched"])
+        self.assertEqual(result["invoice"].pages[1].bill_items[0].item_amount, 80.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
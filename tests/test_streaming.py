@@ -0,0 +1,60 @@
+import unittest
+from unittest.mock import MagicMock
+from types import SimpleNamespace
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from src.llm.streaming import IncrementalItemParser
+from src.llm.client import LLMClient
+
+
+def chunk(text=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=text))] if text is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class TestStreaming(unittest.TestCase):
+    def test_parser_emits_items_as_they_close(self):
+        parser = IncrementalItemParser()
+        self.assertEqual(parser.feed('Sure: [{"item_name": "A {x}", "item_amo'), [])
+        items = parser.feed('unt": 10}, {"item_name": "B\\"", ')
+        self.assertEqual(items, [{"item_name": "A {x}", "item_amount": 10}])
+        items = parser.feed('"item_amount": 5}]')
+        self.assertEqual(items, [{"item_name": 'B"', "item_amount": 5}])
+        self.assertTrue(parser.complete)
+
+    def test_truncated_stream_keeps_completed_items(self):
+        def broken_stream():
+            yield chunk('[{"item_name": "Consultation", "item_amount": "150"},')
+            yield chunk(' {"item_name": "X-Ray", "item_am')
+            raise TimeoutError("read timed out")
+
+        client = LLMClient(api_key="test")
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = broken_stream()
+
+        items = list(client.stream_table("Consultation 150.00"))
+
+        self.assertEqual(items, [{"item_name": "Consultation", "item_rate": 0.0,
+                                  "item_quantity": 1.0, "item_amount": 150.0}])
+        # No usage reported by the broken stream, so it is estimated
+        self.assertGreater(client.get_usage().input_tokens, 0)
+
+    def test_reported_usage_is_used(self):
+        client = LLMClient(api_key="test")
+        client.client = MagicMock()
+        client.client.chat.completions.create.return_value = iter([
+            chunk('[{"item_name": "Dressing", "item_amount": 80}]'),
+            chunk(usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20)),
+        ])
+
+        items = list(client.stream_table("Dressing 80.00"))
+
+        self.assertEqual(len(items), 1)
+        self.assertEqual(client.get_usage().total_tokens, 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
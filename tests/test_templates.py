@@ -0,0 +1,126 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.pipeline.templates import LayoutTemplateStore, find_header, parse_rows, fingerprint
+from src.validation.models import LineItem
+
+PAGE_WIDTH = 1000
+
+
+def word(text, x, y, w=40):
+    return {'text': text, 'conf': 90.0, 'bbox': (x, y, w, 20)}
+
+
+def page(rows, shift=0, columns=(500, 650, 800)):
+    qty_x, rate_x, amount_x = columns
+    lines = [[word("Hospital", 50, 10, 200)],
+             [word("Description", 50 + shift, 100, 120), word("Qty", qty_x + shift, 100),
+              word("Rate", rate_x + shift, 100), word("Amount", amount_x + shift, 100)]]
+    for i, (name, qty, rate, amount) in enumerate(rows):
+        y = 140 + i * 30
+        lines.append([word(name, 50, y, 200), word(qty, qty_x + 5, y, 10),
+                      word(rate, rate_x, y), word(amount, amount_x, y)])
+    lines.append([word("Total", 50, 500), word("350.00", amount_x, 500)])
+    return lines
+
+
+ROWS = [("Consultation", "1", "150.00", "150.00"), ("X-Ray", "2", "100.00", "200.00")]
+
+
+class TestTemplates(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "templates.json")
+
+    def test_find_header_and_parse_rows(self):
+        lines = page(ROWS)
+        header_idx = find_header(lines)
+        self.assertEqual(header_idx, 1)
+
+        _, columns = fingerprint(lines[header_idx], PAGE_WIDTH)
+        items = parse_rows(columns, lines[header_idx + 1:], PAGE_WIDTH)
+        self.assertEqual([i.item_name for i in items], ["Consultation", "X-Ray"])
+        self.assertEqual(items[1].item_quantity, 2.0)
+        self.assertEqual(items[1].item_amount, 200.0)
+
+    def test_learn_then_match_persists(self):
+        store = LayoutTemplateStore(path=self.path)
+        extracted = [LineItem(item_name="Consultation", item_quantity=1, item_rate=150, item_amount=150),
+                     LineItem(item_name="X-Ray", item_quantity=2, item_rate=100, item_amount=200)]
+        self.assertTrue(store.learn(page(ROWS), PAGE_WIDTH, extracted))
+
+        reloaded = LayoutTemplateStore(path=self.path)
+        items = reloaded.match(page([("Blood Test", "1", "80.00", "80.00")]), PAGE_WIDTH)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].item_name, "Blood Test")
+
+    def test_learn_rejects_disagreeing_extraction(self):
+        store = LayoutTemplateStore(path=self.path)
+        extracted = [LineItem(item_name="Other", item_quantity=1, item_rate=999, item_amount=999)]
+        self.assertFalse(store.learn(page(ROWS), PAGE_WIDTH, extracted))
+        self.assertEqual(len(store), 0)
+
+    def test_shifted_layout_does_not_match(self):
+        store = LayoutTemplateStore(path=self.path)
+        extracted = [LineItem(item_name="Consultation", item_quantity=1, item_rate=150, item_amount=150),
+                     LineItem(item_name="X-Ray", item_quantity=2, item_rate=100, item_amount=200)]
+        store.learn(page(ROWS), PAGE_WIDTH, extracted)
+        self.assertIsNone(store.match(page(ROWS, shift=100), PAGE_WIDTH))
+
+    def test_vendors_sharing_header_words_keep_separate_layouts(self):
+        store = LayoutTemplateStore(path=self.path)
+        extracted = [LineItem(item_name="Consultation", item_quantity=1, item_rate=150, item_amount=150),
+                     LineItem(item_name="X-Ray", item_quantity=2, item_rate=100, item_amount=200)]
+        vendor_b = (350, 480, 610)
+        self.assertTrue(store.learn(page(ROWS), PAGE_WIDTH, extracted))
+        self.assertTrue(store.learn(page(ROWS, columns=vendor_b), PAGE_WIDTH, extracted))
+        self.assertEqual(len(store), 2)
+
+        reloaded = LayoutTemplateStore(path=self.path)
+        items = reloaded.match(page([("Blood Test", "3", "80.00", "240.00")], columns=vendor_b), PAGE_WIDTH)
+        self.assertEqual([(i.item_name, i.item_quantity, i.item_amount) for i in items],
+                         [("Blood Test", 3.0, 240.0)])
+
+    def test_workers_sharing_a_store_keep_each_others_layouts(self):
+        # Two worker processes, both loaded before either learned anything
+        worker_a = LayoutTemplateStore(path=self.path)
+        worker_b = LayoutTemplateStore(path=self.path)
+        extracted = [LineItem(item_name="Consultation", item_quantity=1, item_rate=150, item_amount=150),
+                     LineItem(item_name="X-Ray", item_quantity=2, item_rate=100, item_amount=200)]
+        self.assertTrue(worker_a.learn(page(ROWS), PAGE_WIDTH, extracted))
+        self.assertTrue(worker_b.learn(page(ROWS, columns=(350, 480, 610)), PAGE_WIDTH, extracted))
+
+        restarted = LayoutTemplateStore(path=self.path)
+        self.assertEqual(len(restarted), 2)
+        self.assertIsNotNone(restarted.match(page(ROWS), PAGE_WIDTH))
+
+    def test_hits_are_saved(self):
+        store = LayoutTemplateStore(path=self.path, save_interval=0)
+        extracted = [LineItem(item_name="Consultation", item_quantity=1, item_rate=150, item_amount=150),
+                     LineItem(item_name="X-Ray", item_quantity=2, item_rate=100, item_amount=200)]
+        store.learn(page(ROWS), PAGE_WIDTH, extracted)
+        store.match(page(ROWS), PAGE_WIDTH)
+        store.match(page(ROWS), PAGE_WIDTH)
+        other = LayoutTemplateStore(path=self.path, save_interval=0)
+        other.match(page(ROWS), PAGE_WIDTH)
+
+        with open(self.path) as f:
+            (entry,) = json.load(f).values()
+        self.assertEqual(entry["layouts"][0]["hits"], 3)
+
+    def test_old_single_layout_store_is_loaded(self):
+        with open(self.path, "w") as f:
+            json.dump({"description|qty|rate|amount": {
+                "columns": fingerprint(page(ROWS)[1], PAGE_WIDTH)[1], "hits": 0, "last_used": 0}}, f)
+        store = LayoutTemplateStore(path=self.path)
+        self.assertEqual(len(store), 1)
+        self.assertIsNotNone(store.match(page(ROWS), PAGE_WIDTH))
+
+
+if __name__ == '__main__':
+    unittest.main()
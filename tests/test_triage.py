@@ -0,0 +1,122 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+import numpy as np
+from src.pipeline.triage import PageTriage, layout_features
+from pipeline_mocks import mocked_pipeline
+
+
+def words(*rows, width=1000, top=0):
+    """
+    OCR words for rows of (text, ...) cells, spread evenly across the page.
+    """
+    result = []
+    for r, cells in enumerate(rows):
+        step = width // len(cells)
+        for c, text in enumerate(cells):
+            result.append({'text': text, 'conf': 90.0, 'bbox': (c * step + 10, top + r * 30, step - 20, 12)})
+    return result
+
+
+BILL = words(("Description", "Qty", "Rate", "Amount"),
+             ("Consultation", "1", "500.00", "500.00"),
+             ("Dressing", "2", "40.00", "80.00"),
+             ("Sub", "Total", "", "580.00"))
+LAB = words(("Laboratory", "Report", "Specimen:", "Blood"),
+            ("Test", "Result", "Reference Range", "Units"),
+            ("Haemoglobin", "13.5", "13.0-17.0", "g/dL"),
+            ("Total", "Cholesterol", "180", "mg/dL"))
+# Complete blood count: results in the middle, units and ranges on the right
+CBC = words(("CITY DIAGNOSTIC LABORATORY", "Specimen: Whole Blood"),
+            ("Test", "Result", "Units", "Reference Range"),
+            ("Haemoglobin", "13.5", "g/dL", "13.0-17.0"),
+            ("RBC Count", "4.8", "mill/cumm", "4.5-5.5"),
+            ("WBC Count", "7,200", "cumm", "4000-11000"),
+            ("Platelets", "2.5", "lakh/cumm", "1.5-4.1"),
+            ("PCV", "42.1", "%", "40-50"),
+            ("MCV", "87.7", "fL", "83-101"),
+            ("MCH", "28.1", "pg", "27-32"),
+            ("Neutrophils", "62", "%", "40-80"))
+# Hospital bill split by department, integer amounts and no bill keyword
+DEPARTMENTS = words(("LABORATORY INVESTIGATIONS",),
+                    ("CBC", "1", "350", "350"),
+                    ("Lipid Profile", "1", "600", "600"),
+                    ("RADIOLOGY",),
+                    ("X-Ray Chest", "1", "450", "450"),
+                    ("USG Abdomen", "1", "1,200", "1,200"),
+                    ("CLINICAL PATHOLOGY",),
+                    ("Urine Routine", "1", "150", "150"),
+                    ("Stool Routine", "1", "150", "150"))
+SUMMARY = words(("Discharge", "Summary", "Patient:", "R Sharma"),
+                ("Diagnosis:", "Acute", "Gastroenteritis", ""),
+                ("Chief Complaint:", "Vomiting", "since", "2 days"),
+                ("History of", "present", "illness", "none"))
+
+
+class TestTriage(unittest.TestCase):
+    def classify(self, ocr_words):
+        ocr = MagicMock()
+        ocr.extract_data.return_value = ocr_words
+        return PageTriage(enabled=True).classify(np.zeros((100, 1000), dtype=np.uint8), ocr)
+
+    def test_bill_page_is_kept(self):
+        result = self.classify(BILL)
+        self.assertEqual(result.category, "bill")
+        self.assertEqual(result.page_type, "Bill Detail")
+        self.assertGreaterEqual(result.features["amount_column"], 0.5)
+
+    def test_lab_report_is_irrelevant(self):
+        result = self.classify(LAB)
+        self.assertEqual(result.category, "irrelevant")
+        self.assertFalse(result.relevant)
+
+    def test_numeric_lab_report_is_irrelevant(self):
+        result = self.classify(CBC)
+        # Mostly numeric rows, but no amount column and no bill keyword
+        self.assertGreaterEqual(result.features["numeric_density"], 0.6)
+        self.assertEqual(result.features["amount_column"], 0.0)
+        self.assertEqual(result.category, "irrelevant")
+
+    def test_department_split_bill_is_kept(self):
+        result = self.classify(DEPARTMENTS)
+        self.assertTrue(result.relevant)
+        self.assertEqual(result.features["numeric_rows"], 6)
+        self.assertEqual(result.features["amount_rows"], 6)
+
+    def test_irrelevant_only_without_numeric_features(self):
+        self.assertEqual(self.classify(SUMMARY).category, "irrelevant")
+        # The same keywords over an amount column keep the page
+        self.assertTrue(self.classify(SUMMARY + words(*[("Room charges", "1", "900", "900")] * 3, top=200)).relevant)
+
+    def test_pharmacy_and_unreadable(self):
+        self.assertEqual(self.classify(BILL + words(("Pharmacy", "Bill"))).page_type, "Pharmacy")
+        result = self.classify(words(("blurry", "text")))
+        self.assertEqual(result.category, "unknown")
+        self.assertTrue(result.relevant)
+
+    def test_layout_features(self):
+        features = layout_features(BILL, 1000)
+        self.assertEqual(features["rows"], 4)
+        self.assertEqual(features["numeric_rows"], 3)
+
+
+class TestPipelineTriage(unittest.TestCase):
+    def test_irrelevant_page_skips_full_ocr(self):
+        pipeline = mocked_pipeline(page_count=2, image=np.zeros((100, 1000), dtype=np.uint8), triage=True)
+        # Page 1: lab report thumbnail. Page 2: bill thumbnail, then full OCR.
+        pipeline.ocr.extract_data.side_effect = [LAB, BILL, BILL]
+        pipeline.ocr.extract_text.return_value = "Consultation 1 500.00 500.00\nSub Total 580.00"
+
+        result = pipeline.process_url("http://example.com/bundle.pdf")
+
+        self.assertEqual([p.page_no for p in result["invoice"].pages], ["2"])
+        self.assertEqual(pipeline.ocr.extract_text.call_count, 1)
+        pipeline.llm.stream_table.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("GROQ_API_KEY", "test")
+from fastapi.testclient import TestClient
+from src import api
+from src.pipeline import core
+from src.pipeline.warmup import WarmupState, warm_up
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestWarmup(unittest.TestCase):
+    def setUp(self):
+        self.state = WarmupState()
+        patcher = patch.object(api, "warmup_state", self.state)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(api.app)
+
+    def test_health_is_503_until_warmed_up(self):
+        self.assertEqual(self.client.get("/health").status_code, 503)
+
+        with patch.object(core, "ExtractionPipeline", MagicMock()):
+            warm_up(self.state)
+
+        response = self.client.get("/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["warmup"]["failed_steps"], [])
+
+    def test_failed_step_keeps_worker_unready(self):
+        with patch.object(core, "ExtractionPipeline", MagicMock(side_effect=RuntimeError("no tesseract"))):
+            warm_up(self.state)
+
+        response = self.client.get("/health")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "warmup_failed")
+        # The synthetic page never ran without a pipeline
+        self.assertEqual(response.json()["warmup"]["failed_steps"], ["pipeline", "synthetic_page"])
+
+    def test_import_loads_no_heavy_modules(self):
+        code = ("import sys; import src.pipeline.core, src.api; "
+                "print(','.join(m for m in ('cv2', 'pdf2image', 'pytesseract', 'groq') if m in sys.modules))")
+        env = dict(os.environ, GROQ_API_KEY="test")
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()